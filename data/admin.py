@@ -1,11 +1,31 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import router, transaction
+from django.forms.models import BaseInlineFormSet
+from django.http import JsonResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils.html import format_html
 
 
-from data.models import Concept, Journal, Publisher
+from data.apc_import import ApcFileError, ApcImport, detect_format, read_rows
+from data.changelist import KeysetPaginationMixin
+from data.forms import ApcImportForm, PublisherIdWidget
+from data.models import (
+    Concept,
+    Journal,
+    Publisher,
+    PublisherHierarchy,
+    normalize_issn,
+)
+from data.search import publisher_autocomplete_page, search_publishers
+from jobs.models import Job
+from project.exports import export_as_csv, export_as_jsonl
+from project.permissions import in_group_or_superuser
 
 
-class ConceptAdmin(admin.ModelAdmin):
+class ConceptAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    keyset_ordering = ("-field_of_study_id",)
     list_display = (
         "field_of_study_id",
         "display_name",
@@ -33,6 +53,10 @@ class ConceptAdmin(admin.ModelAdmin):
         "updated_date",
     )
 
+    def get_queryset(self, request):
+        # description is stored, so the change form never needs the json blobs
+        return super().get_queryset(request).defer("wikidata_json", "wikipedia_json")
+
     def has_delete_permission(self, request, obj=None):
         return False
 
@@ -40,8 +64,9 @@ class ConceptAdmin(admin.ModelAdmin):
         return False
 
 
-class JournalAdmin(admin.ModelAdmin):
-    list_display = ("journal_id", "display_name", "paper_count")
+class JournalAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ("journal_id", "display_name", "publisher_name", "paper_count")
+    changelist_extra_fields = ("publisher_id",)
     fields = (
         "journal_id",
         "display_name",
@@ -55,7 +80,8 @@ class JournalAdmin(admin.ModelAdmin):
         "paper_count",
         "issns",
     )
-    search_fields = ("display_name", "journal_id", "issns")
+    # issns are matched exactly through their index, see get_search_results
+    search_fields = ("display_name", "journal_id")
     readonly_fields = (
         "journal_id",
         "wikidata_id",
@@ -68,9 +94,120 @@ class JournalAdmin(admin.ModelAdmin):
         qs = super(JournalAdmin, self).get_queryset(request)
         return qs.filter(paper_count__gt=0, merge_into_id__isnull=True).exclude(type="repository")
 
+    change_list_template = "admin/data/journal/change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path(
+                "import-apc/",
+                self.admin_site.admin_view(self.import_apc_view),
+                name="data_journal_import_apc",
+            ),
+            path(
+                "publisher-autocomplete/",
+                self.admin_site.admin_view(self.publisher_autocomplete_view),
+                name="data_journal_publisher_autocomplete",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "publisher_id":
+            kwargs["widget"] = PublisherIdWidget(
+                reverse("admin:data_journal_publisher_autocomplete")
+            )
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def publisher_autocomplete_view(self, request):
+        """select2 json: {"results": [{"id", "text"}], "pagination": {"more"}}"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        rows, more = publisher_autocomplete_page(
+            Publisher.objects.all(), request.GET.get("term", ""), page
+        )
+        return JsonResponse(
+            {
+                "results": [
+                    {"id": str(pk), "text": f"{name} ({pk})"} for pk, name in rows
+                ],
+                "pagination": {"more": more},
+            }
+        )
+
+    def get_changelist_instance(self, request):
+        # look up the publishers for the whole page at once instead of per row
+        cl = super().get_changelist_instance(request)
+        publisher_ids = {j.publisher_id for j in cl.result_list if j.publisher_id}
+        publishers = Publisher.objects.only("publisher_id", "display_name").in_bulk(
+            publisher_ids
+        )
+        for journal in cl.result_list:
+            journal._publisher = publishers.get(journal.publisher_id)
+        return cl
+
+    def publisher_name(self, obj):
+        publisher = getattr(obj, "_publisher", None)
+        if publisher is None:
+            return obj.publisher_id or "-"
+        url = reverse("admin:data_publisher_change", args=[publisher.publisher_id])
+        return format_html('<a href="{}">{}</a>', url, publisher.display_name)
+
+    publisher_name.short_description = "Publisher"
+
+    def import_apc_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        report = None
+        applied = False
+        if request.method == "POST":
+            form = ApcImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data["file"]
+                try:
+                    rows = read_rows(upload, detect_format(upload.name))
+                except ApcFileError as e:
+                    for line_number, error in e.errors:
+                        form.add_error("file", f"line {line_number}: {error}")
+                    rows = None
+                if rows is not None:
+                    apc_import = ApcImport(rows).plan()
+                    report = list(apc_import.report_lines())
+                    if not form.cleaned_data["dry_run"] and not apc_import.errors:
+                        count = apc_import.apply()
+                        applied = True
+                        messages.success(
+                            request, f"Updated APC prices for {count} journals."
+                        )
+        else:
+            form = ApcImportForm()
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "report": report,
+            "applied": applied,
+        }
+        return TemplateResponse(request, "admin/data/journal/apc_import.html", context)
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        issn = normalize_issn(search_term)
+        if issn:
+            # an issn-shaped term can also be a journal id or part of a name
+            results |= queryset.with_issns([issn])
+        return results, may_have_duplicates
+
     list_filter = ("apc_found",)
+    actions = [export_as_csv, export_as_jsonl]
 
     ordering = ("-paper_count",)
+    keyset_ordering = ("-paper_count", "-journal_id")
 
     def has_delete_permission(self, request, obj=None):
         return False
@@ -96,7 +233,94 @@ class JournalAdmin(admin.ModelAdmin):
     webpage_link.short_description = "Webpage"  # Sets column name in admin
 
 
-class PublisherAdmin(admin.ModelAdmin):
+class TopLevelParentFilter(admin.SimpleListFilter):
+    title = "top-level parent"
+    parameter_name = "top_level_parent"
+    # the biggest hierarchies are offered as links; any id works in the url
+    max_choices = 20
+
+    def lookups(self, request, model_admin):
+        return [
+            (str(publisher_id), f"{display_name} ({size})")
+            for publisher_id, display_name, size in (
+                PublisherHierarchy.objects.top_level_parents(self.max_choices)
+            )
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(
+            publisher_id__in=PublisherHierarchy.objects.descendant_ids(int(value))
+        )
+
+
+class LimitedInlineFormSet(BaseInlineFormSet):
+    """shows only the first `limit` rows, big hierarchies have thousands"""
+
+    limit = 100
+
+    def get_queryset(self):
+        if not hasattr(self, "_limited_queryset"):
+            self._limited_queryset = super().get_queryset()[: self.limit]
+        return self._limited_queryset
+
+
+class HierarchyInline(admin.TabularInline):
+    model = PublisherHierarchy
+    formset = LimitedInlineFormSet
+    extra = 0
+    can_delete = False
+    # the publisher on the other end of the row
+    other = None
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .filter(depth__gt=0)
+            .select_related(self.other)
+            .order_by("depth", f"{self.other}_id")
+        )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def publisher_link(self, obj):
+        publisher = getattr(obj, self.other)
+        url = reverse("admin:data_publisher_change", args=[publisher.publisher_id])
+        return format_html('<a href="{}">{}</a>', url, publisher)
+
+    publisher_link.short_description = "Publisher"
+
+
+class AncestorInline(HierarchyInline):
+    fk_name = "descendant"
+    other = "ancestor"
+    fields = readonly_fields = ("publisher_link", "depth")
+    verbose_name = "ancestor"
+    verbose_name_plural = "ancestors"
+
+
+class DescendantInline(HierarchyInline):
+    fk_name = "ancestor"
+    other = "descendant"
+    fields = readonly_fields = ("publisher_link", "depth")
+    verbose_name = "descendant"
+    verbose_name_plural = f"descendants (first {LimitedInlineFormSet.limit})"
+
+
+class PublisherAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    keyset_ordering = ("-publisher_id",)
     list_display = (
         "publisher_id",
         "display_name",
@@ -109,11 +333,72 @@ class PublisherAdmin(admin.ModelAdmin):
         "ror_id",
         "alternate_titles",
         "country_code",
+        "parent_publisher",
+        "enrichment_status",
         "is_approved",
     )
-    list_filter = ("is_approved",)
+    list_filter = ("is_approved", TopLevelParentFilter)
+    inlines = [AncestorInline, DescendantInline]
+    # matched against search_document, publisher_id and wikidata_id by search_publishers
     search_fields = ("display_name", "publisher_id", "alternate_titles", "wikidata_id")
-    readonly_fields = ("publisher_id", "alternate_titles", "country_code")
+    readonly_fields = (
+        "publisher_id",
+        "alternate_titles",
+        "country_code",
+        "enrichment_status",
+    )
+
+    actions = ["refresh_enrichment", export_as_csv, export_as_jsonl]
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "parent_publisher":
+            kwargs["widget"] = PublisherIdWidget(
+                reverse("admin:data_journal_publisher_autocomplete")
+            )
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_publishers(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        # enrichment calls ROR and Wikidata, so leave it to the run_jobs worker,
+        # and skip it entirely for edits like approval toggles
+        needs_enrichment = obj.enrichment_fields_changed()
+        obj.save(enrich=False)
+        if needs_enrichment:
+            self.enqueue_enrichment(request, [obj])
+
+    @admin.action(description="Refresh alternate titles, country and ROR id")
+    def refresh_enrichment(self, request, queryset):
+        self.enqueue_enrichment(request, queryset.only("publisher_id"))
+
+    def enqueue_enrichment(self, request, publishers):
+        jobs = [
+            (p.enrichment_job_key, {"publisher_id": p.publisher_id}) for p in publishers
+        ]
+        # jobs live in the default database and commit right away; queued before the
+        # publisher commits, the worker could enrich the old row and write its
+        # ror_id and alternate_titles over the edit
+        transaction.on_commit(
+            lambda: Job.objects.enqueue_many("data.tasks.enrich_publisher", jobs),
+            using=router.db_for_write(Publisher),
+        )
+        messages.info(
+            request,
+            f"Alternate titles, country code and ROR id will be updated in the background ({len(jobs)} publishers).",
+        )
+
+    def enrichment_status(self, obj):
+        if not obj.publisher_id:
+            return "-"
+        job = Job.objects.latest_for_key(obj.enrichment_job_key)
+        if job is None:
+            return "-"
+        return f"{job.get_status_display()} ({job.updated:%Y-%m-%d %H:%M})"
+
+    enrichment_status.short_description = "Enrichment"
 
     # permissions
 
@@ -134,11 +419,7 @@ class PublisherAdmin(admin.ModelAdmin):
 
 
 def is_editor_or_superuser(user):
-    if user.is_superuser:
-        return True
-    if user.groups.filter(name="Editors").exists():
-        return True
-    return False
+    return in_group_or_superuser(user, "Editors")
 
 
 admin.site.register(Concept, ConceptAdmin)
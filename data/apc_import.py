@@ -0,0 +1,250 @@
+import csv
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.utils import timezone
+
+from data.currency import compute_apc_usd_many, conversion_currency, get_rate_table
+from data.models import Journal, normalize_issn, validate_apc_prices
+from project.utils import chunked
+
+APC_IMPORT_FIELDS = [
+    "apc_prices",
+    "apc_found",
+    "apc_usd",
+    "apc_usd_rate_date",
+    "updated_date",
+]
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+FALSE_VALUES = {"0", "false", "f", "no", "n"}
+# issns resolved per query, each one is an OR'd containment test
+ISSN_LOOKUP_SIZE = 500
+
+
+def detect_format(filename):
+    return "jsonl" if filename.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+class ApcFileError(ValueError):
+    """the file couldn't be read; errors is [(line number, message)]"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"line {n}: {message}" for n, message in errors))
+        self.errors = errors
+
+
+def decode_lines(fp):
+    """utf-8 lines of a binary file, raising ApcFileError at the first undecodable one"""
+    for line_number, line in enumerate(fp, start=1):
+        try:
+            yield line.decode("utf-8-sig" if line_number == 1 else "utf-8")
+        except UnicodeDecodeError:
+            raise ApcFileError([(line_number, "the file is not utf-8 encoded")])
+
+
+def read_rows(fp, fmt):
+    """[(line number, dict)] from a binary csv file with a header row or jsonl file.
+
+    raises ApcFileError listing every line that isn't a json object, or the line where
+    the file stopped being readable (not utf-8, broken csv)."""
+    rows = []
+    errors = []
+    lines = decode_lines(fp)
+    if fmt == "jsonl":
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                errors.append((line_number, f"invalid json: {e}"))
+                continue
+            if not isinstance(row, dict):
+                kind = type(row).__name__
+                errors.append((line_number, f"expected a json object, got {kind}"))
+                continue
+            rows.append((line_number, row))
+    else:
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                rows.append((reader.line_num, row))
+        except csv.Error as e:
+            errors.append((reader.line_num, f"invalid csv: {e}"))
+    if errors:
+        raise ApcFileError(errors)
+    return rows
+
+
+def parse_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value == "":
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"apc_found should be true or false, got {value!r}")
+
+
+class ApcImport:
+    """plans and applies apc_prices updates from rows of
+    (journal_id or issn, price, currency, apc_found).
+
+    rows for the same journal are combined into one apc_prices list, in file order. a
+    row with apc_found false and no price clears the journal's prices. nothing is
+    written if any row is invalid."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.errors = []
+        self.changes = []
+        self.unchanged = 0
+
+    def plan(self):
+        rate_table = get_rate_table()
+        journal_ids = self._resolve_journal_ids()
+        prices = OrderedDict()
+        apc_found = {}
+        for line_number, row in self.rows:
+            journal_id = journal_ids.get(line_number)
+            if journal_id is None:
+                continue
+            price = row.get("price")
+            if price not in (None, "") and not str(price).strip().isdigit():
+                self.errors.append((line_number, f"price should be an integer, got {price!r}"))
+                continue
+            try:
+                found = parse_bool(row.get("apc_found"))
+            except ValueError as e:
+                self.errors.append((line_number, str(e)))
+                continue
+            if price in (None, "") and found is not False:
+                # an empty price only clears a journal's prices when it is explicit
+                self.errors.append(
+                    (line_number, "price is required unless apc_found is false")
+                )
+                continue
+            journal_prices = prices.setdefault(journal_id, [])
+            if price not in (None, ""):
+                journal_prices.append(
+                    {
+                        "price": int(price),
+                        "currency": str(row.get("currency") or "").strip().upper(),
+                    }
+                )
+            if found is not None:
+                apc_found[journal_id] = found
+
+        journals = Journal.objects.only(
+            "journal_id", "display_name", *APC_IMPORT_FIELDS
+        ).in_bulk(list(prices))
+        valid = []
+        for journal_id, apc_prices in prices.items():
+            journal = journals.get(journal_id)
+            if journal is None:
+                self.errors.append((None, f"journal {journal_id} not found"))
+                continue
+            try:
+                validate_apc_prices(apc_prices)
+            except ValidationError as e:
+                self.errors.append((None, f"journal {journal_id}: {e.messages[0]}"))
+                continue
+            currency = conversion_currency(apc_prices)
+            if currency is not None and currency not in rate_table.currencies:
+                self.errors.append(
+                    (None, f"journal {journal_id}: {currency} is not a supported currency")
+                )
+                continue
+            valid.append((journal, apc_prices))
+
+        results = compute_apc_usd_many([p for _, p in valid], rate_table)
+        for (journal, apc_prices), result in zip(valid, results):
+            apc_usd, rate_date = result or (None, None)
+            new = {
+                "apc_prices": apc_prices or None,
+                "apc_found": apc_found.get(journal.journal_id, journal.apc_found),
+                "apc_usd": apc_usd,
+                "apc_usd_rate_date": rate_date,
+            }
+            old = {field: getattr(journal, field) for field in new}
+            if old == new:
+                self.unchanged += 1
+                continue
+            self.changes.append((journal, old, new))
+        return self
+
+    def _resolve_journal_ids(self):
+        """map line numbers to journal ids, looking up all issns in one query"""
+        journal_ids = {}
+        issns = {}
+        for line_number, row in self.rows:
+            journal_id = str(row.get("journal_id") or "").strip()
+            issn = str(row.get("issn") or "").strip()
+            if journal_id:
+                if not journal_id.isdigit():
+                    self.errors.append((line_number, f"invalid journal_id {journal_id!r}"))
+                    continue
+                journal_ids[line_number] = int(journal_id)
+            elif issn:
+                normalized = normalize_issn(issn)
+                if normalized is None:
+                    self.errors.append((line_number, f"invalid issn {issn!r}"))
+                    continue
+                issns[line_number] = normalized
+            else:
+                self.errors.append((line_number, "journal_id or issn is required"))
+
+        matches = {}
+        for chunk in chunked(sorted(set(issns.values())), ISSN_LOOKUP_SIZE):
+            wanted = set(chunk)
+            for journal in Journal.objects.with_issns(chunk).only(
+                "journal_id", "issn", "issns"
+            ):
+                for issn in wanted.intersection(journal.all_issns):
+                    matches.setdefault(issn, set()).add(journal.journal_id)
+        for line_number, issn in issns.items():
+            found = matches.get(issn, set())
+            if len(found) == 1:
+                journal_ids[line_number] = next(iter(found))
+            elif not found:
+                self.errors.append((line_number, f"no journal with issn {issn}"))
+            else:
+                self.errors.append(
+                    (line_number, f"issn {issn} matches journals {sorted(found)}")
+                )
+        return journal_ids
+
+    def apply(self):
+        if self.errors:
+            raise ValueError("not applying an import with errors")
+        now = timezone.now()
+        journals = []
+        for journal, old, new in self.changes:
+            for field, value in new.items():
+                setattr(journal, field, value)
+            journal.updated_date = now
+            journals.append(journal)
+        with transaction.atomic(using=router.db_for_write(Journal)):
+            Journal.objects.bulk_update(journals, APC_IMPORT_FIELDS, batch_size=1000)
+        return len(journals)
+
+    def report_lines(self):
+        for line_number, error in self.errors:
+            prefix = f"line {line_number}: " if line_number else ""
+            yield f"error: {prefix}{error}"
+        for journal, old, new in self.changes:
+            diffs = ", ".join(
+                f"{field} {old[field]!r} -> {new[field]!r}"
+                for field in new
+                if old[field] != new[field]
+            )
+            yield f"journal {journal.journal_id} ({journal.display_name}): {diffs}"
+        yield (
+            f"{len(self.changes)} to change, {self.unchanged} unchanged, "
+            f"{len(self.errors)} errors"
+        )
@@ -0,0 +1,154 @@
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from data.search import SEARCH_RANK
+
+CURSOR_VAR = "after"
+
+
+class EstimatedCountPaginator(Paginator):
+    """uses the postgres planner's row estimate instead of an exact COUNT(*) on big tables"""
+
+    # below this, an exact count is cheap enough and nicer to look at
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != "postgresql":
+            return super().count
+        estimate = self.estimated_count(connection)
+        if estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+    def estimated_count(self, connection):
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def keyset_filter(ordering, values):
+    """rows that come after values when sorted by ordering, e.g. ("-paper_count", "-journal_id")"""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+class KeysetChangeList(ChangeList):
+    """pages through the default ordering with "after" cursors instead of OFFSET,
+    so deep pages cost the same as the first one. sorting by a column falls back
+    to regular (estimated count) pagination."""
+
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        # don't carry the cursor into filter and search links
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, *args, **kwargs):
+        qs = super().get_queryset(request, *args, **kwargs)
+        return qs.only(*self.model_admin.get_changelist_fields(request))
+
+    def get_ordering(self, request, queryset):
+        # best matches first for ranked searches, unless a column was clicked
+        if ORDER_VAR not in self.params and SEARCH_RANK in queryset.query.annotations:
+            return ["-" + SEARCH_RANK, "-pk"]
+        return super().get_ordering(request, queryset)
+
+    @property
+    def keyset_ordering(self):
+        return self.model_admin.keyset_ordering
+
+    def get_results(self, request):
+        self.keyset = (
+            ORDER_VAR not in self.params
+            and ALL_VAR not in self.params
+            # ranked search results keep their own order
+            and SEARCH_RANK not in self.queryset.query.annotations
+        )
+        if not self.keyset:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        qs = self.queryset.order_by(*self.keyset_ordering)
+        cursor = request.GET.get(CURSOR_VAR)
+        if cursor:
+            qs = qs.filter(keyset_filter(self.keyset_ordering, self.decode_cursor(cursor)))
+        rows = list(qs[: self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        rows = rows[: self.list_per_page]
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_next or bool(cursor)
+        self.paginator = paginator
+        self.first_page_url = (
+            self.get_query_string(remove=[CURSOR_VAR]) if cursor else None
+        )
+        self.next_page_url = (
+            self.get_query_string({CURSOR_VAR: self.encode_cursor(rows[-1])})
+            if has_next
+            else None
+        )
+
+    def encode_cursor(self, obj):
+        return ",".join(str(getattr(obj, f.lstrip("-"))) for f in self.keyset_ordering)
+
+    def decode_cursor(self, cursor):
+        fields = [self.lookup_opts.get_field(f.lstrip("-")) for f in self.keyset_ordering]
+        values = cursor.split(",")
+        if len(values) != len(fields):
+            raise IncorrectLookupParameters
+        try:
+            return [f.to_python(v) for f, v in zip(fields, values)]
+        except ValidationError:
+            raise IncorrectLookupParameters
+
+
+class KeysetPaginationMixin:
+    """ModelAdmin mixin for big tables; set keyset_ordering to unique, non-null sort keys"""
+
+    keyset_ordering = None
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/data/keyset_change_list.html"
+
+    # model fields to load for the changelist besides list_display and the sort keys
+    changelist_extra_fields = ()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_changelist_fields(self, request):
+        """only these columns are selected for changelist rows, which keeps big json
+        columns out of the page query"""
+        opts = self.model._meta
+        concrete = {f.name for f in opts.concrete_fields}
+        fields = {opts.pk.name}
+        fields.update(f for f in self.get_list_display(request) if f in concrete)
+        fields.update(f.lstrip("-") for f in self.keyset_ordering or ())
+        fields.update(self.changelist_extra_fields)
+        return sorted(fields)
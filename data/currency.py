@@ -0,0 +1,144 @@
+import threading
+import time
+
+from currency_converter import CURRENCY_FILE, CurrencyConverter, RateNotFoundError
+from currency_converter.currency_converter import get_lines_from_zip
+
+# how often to check whether refresh_currency_rates stored newer rates
+RELOAD_CHECK_INTERVAL = 60
+
+
+class RateTable:
+    """USD conversion rates for every currency, taken from one ECB rates snapshot.
+
+    Parsing the ECB file is the slow part, so refresh_currency_rates stores the parsed
+    rates (CurrencyRates) and every process builds its table from the newest row."""
+
+    def __init__(self, rates, date, version=None):
+        # {currency: (rate, USD rate)} against EUR, on the currency's last date
+        self._rates = rates
+        # the snapshot date: the most recent day in the rates file
+        self.date = date
+        # the CurrencyRates row the table was built from, None for the bundled file
+        self.version = version
+
+    @classmethod
+    def from_converter(cls, converter):
+        rates = {}
+        for currency in converter.currencies:
+            # same rates CurrencyConverter.convert() uses when no date is given
+            last_date = converter.bounds[currency].last_date
+            try:
+                rates[currency] = (
+                    converter._get_rate(currency, last_date),
+                    converter._get_rate("USD", last_date),
+                )
+            except RateNotFoundError:
+                continue
+        return cls(rates, converter.bounds["USD"].last_date)
+
+    @classmethod
+    def from_file(cls, currency_file=CURRENCY_FILE):
+        return cls.from_converter(CurrencyConverter(currency_file))
+
+    @classmethod
+    def from_zip(cls, content):
+        """parse the zipped csv ECB publishes (eurofxref-hist.zip)"""
+        converter = CurrencyConverter(None)
+        converter.load_lines(get_lines_from_zip(content))
+        return cls.from_converter(converter)
+
+    @classmethod
+    def from_stored(cls, stored):
+        rates = {currency: tuple(pair) for currency, pair in stored.rates.items()}
+        return cls(rates, stored.date, version=stored.pk)
+
+    @property
+    def currencies(self):
+        return set(self._rates)
+
+    def convert(self, price, currency):
+        """convert price in currency to whole US dollars"""
+        if currency not in self._rates:
+            raise ValueError(f"{currency} is not a supported currency")
+        from_rate, usd_rate = self._rates[currency]
+        return int(float(price) / from_rate * usd_rate)
+
+    def convert_many(self, prices, currencies):
+        """convert parallel sequences of prices and currencies, one lookup per currency"""
+        rates = {c: self._rates.get(c) for c in set(currencies)}
+        missing = [c for c, rate in rates.items() if rate is None]
+        if missing:
+            raise ValueError(f"{', '.join(sorted(missing))} not supported currencies")
+        return [
+            int(float(price) / rates[currency][0] * rates[currency][1])
+            for price, currency in zip(prices, currencies)
+        ]
+
+
+_table = None
+_last_check = 0
+_lock = threading.Lock()
+
+
+def get_rate_table():
+    """process-wide rate table, rebuilt when refresh_currency_rates has stored newer
+    rates. until it has run once, the file bundled with currency_converter is used"""
+    from data.models import CurrencyRates
+
+    global _table, _last_check
+    now = time.monotonic()
+    if _table is not None and now - _last_check < RELOAD_CHECK_INTERVAL:
+        return _table
+    with _lock:
+        _last_check = now
+        latest = CurrencyRates.objects.latest_id()
+        if latest is None:
+            if _table is None or _table.version is not None:
+                _table = RateTable.from_file()
+        elif _table is None or _table.version != latest:
+            _table = RateTable.from_stored(CurrencyRates.objects.get(pk=latest))
+    return _table
+
+
+def invalidate_rate_table():
+    """make the next get_rate_table() check for newer rates"""
+    global _last_check
+    _last_check = 0
+
+
+def refresh_rate_table():
+    invalidate_rate_table()
+    return get_rate_table()
+
+
+def conversion_currency(apc_prices):
+    """the currency set_apc_usd() converts from, or None if there is a USD price"""
+    if not apc_prices or any(item["currency"] == "USD" for item in apc_prices):
+        return None
+    return apc_prices[0]["currency"]
+
+
+def compute_apc_usd_many(apc_prices_list, rate_table=None):
+    """return (apc_usd, rate_date) for each validated apc_prices list, like Journal.set_apc_usd().
+
+    A USD price is used as is; otherwise the first price is converted. All conversions
+    happen in one convert_many() call. Empty lists give None."""
+    rate_table = rate_table or get_rate_table()
+    results = [None] * len(apc_prices_list)
+    to_convert = []
+    for i, apc_prices in enumerate(apc_prices_list):
+        if not apc_prices:
+            continue
+        currency = conversion_currency(apc_prices)
+        if currency is None:
+            usd = next(item for item in apc_prices if item["currency"] == "USD")
+            results[i] = (usd["price"], None)
+        else:
+            to_convert.append((i, apc_prices[0]["price"], currency))
+    if to_convert:
+        indexes, prices, currencies = zip(*to_convert)
+        converted = rate_table.convert_many(prices, currencies)
+        for i, apc_usd in zip(indexes, converted):
+            results[i] = (apc_usd, rate_table.date)
+    return results
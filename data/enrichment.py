@@ -0,0 +1,229 @@
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from data.cache import TTLCache
+from data.ror_index import RorIndex
+from project.http import get_session
+
+ROR_API_URL = "https://api.ror.org/organizations"
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+# wbgetentities accepts at most 50 ids per request
+WIKIDATA_BATCH_SIZE = 50
+
+WIKIDATA_ID_RE = re.compile(r"(?:^|/)(Q\d+)/?$", re.IGNORECASE)
+
+
+class EnrichmentError(Exception):
+    """ROR or Wikidata couldn't be asked (timeout, connection error, open circuit
+    breaker, 429 or 5xx). unlike a 404 this says nothing about the publisher, so the
+    fields it would have filled are left alone."""
+
+
+_missing = object()
+
+
+class TokenBucket:
+    """allows `rate` calls per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.last) * self.rate
+                )
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """one token bucket per host"""
+
+    def __init__(self, default_rate, rates=None):
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rates.get(host, self.default_rate))
+                self._buckets[host] = bucket
+        bucket.acquire()
+
+
+def normalize_wikidata_id(wikidata_id):
+    """return the bare Q-id from any of the wikidata url forms we store, or None"""
+    if not wikidata_id:
+        return None
+    match = WIKIDATA_ID_RE.search(wikidata_id.strip())
+    if match is None:
+        return None
+    return match.group(1).upper()
+
+
+def normalize_ror_id(ror_id):
+    """ror ids are stored either bare or as https://ror.org/... urls"""
+    return ror_id.strip().replace("https://ror.org/", "").replace("http://ror.org/", "")
+
+
+class EnrichmentClient:
+    """fetches ROR and Wikidata records over the shared outbound session and caches the
+    parsed responses.
+
+    ROR lookups are answered from the local dump index first when one is available."""
+
+    def __init__(
+        self,
+        session=None,
+        cache_size=1024,
+        cache_ttl=3600,
+        ror_index=None,
+        rate_limiter=None,
+        stats=None,
+    ):
+        self.session = session or get_session()
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.ror_index = ror_index
+        # optional, set by bulk jobs to throttle and measure upstream calls
+        self.rate_limiter = rate_limiter
+        self.stats = stats
+
+    def _get_json(self, cache_key, url, params=None):
+        cached = self.cache.get(cache_key, _missing)
+        if cached is not _missing:
+            return cached
+        json_response = self._request_json(url, params=params)
+        if json_response is not None:
+            # don't cache misses, the record may be there next time
+            self.cache.set(cache_key, json_response)
+        return json_response
+
+    def _request_json(self, url, params=None):
+        host = urlsplit(url).netloc
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(host)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, params=params)
+        except requests.RequestException as e:
+            # timeouts, connection errors and open breakers
+            raise EnrichmentError(f"{host}: {e}") from e
+        finally:
+            if self.stats is not None:
+                self.stats.record(host, time.monotonic() - start)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise EnrichmentError(f"{host} returned {response.status_code}")
+        if response.status_code != 200:
+            # not found, or a query ROR can't parse: there is nothing to enrich with
+            return None
+        try:
+            return response.json()
+        except ValueError as e:
+            raise EnrichmentError(f"{host} returned invalid json") from e
+
+    def get_ror_organization(self, ror_id):
+        if not ror_id:
+            return None
+        ror_id = normalize_ror_id(ror_id)
+        if self.ror_index is not None and self.ror_index.available:
+            organization = self.ror_index.get_organization(ror_id)
+            if organization is not None:
+                return organization
+        return self._get_json(("ror", ror_id), f"{ROR_API_URL}/{ror_id}")
+
+    def find_ror_id_by_wikidata_id(self, wikidata_id):
+        if self.ror_index is not None and self.ror_index.available:
+            ror_id = self.ror_index.find_by_wikidata_id(wikidata_id)
+            if ror_id:
+                return ror_id
+        organization = self.search_ror(wikidata_id)
+        if organization is not None:
+            return organization.get("id", None)
+
+    def find_ror_id_by_name(self, name):
+        if self.ror_index is not None and self.ror_index.available:
+            ror_id = self.ror_index.find_by_name(name)
+            if ror_id:
+                return ror_id
+        organization = self.search_ror(f'"{name}"')
+        if organization is not None:
+            return organization.get("id", None)
+
+    def search_ror(self, query):
+        """return the first ROR organization matching query, if any"""
+        json_response = self._get_json(
+            ("ror-search", query), ROR_API_URL, params={"query": query}
+        )
+        if not json_response:
+            return None
+        items = json_response.get("items", [])
+        return items[0] if items else None
+
+    def get_wikidata_aliases(self, wikidata_ids):
+        """return {qid: [english aliases]} for the given ids, in batches of 50 per request.
+
+        ids may be in any of the stored url forms; the result is keyed by bare Q-id.
+        raises EnrichmentError if a batch can't be fetched."""
+        qids = {normalize_wikidata_id(w) for w in wikidata_ids} - {None}
+        aliases = {}
+        to_fetch = []
+        for qid in qids:
+            cached = self.cache.get(("wikidata", qid), _missing)
+            if cached is _missing:
+                to_fetch.append(qid)
+            else:
+                aliases[qid] = cached
+        to_fetch.sort()
+        for i in range(0, len(to_fetch), WIKIDATA_BATCH_SIZE):
+            batch = to_fetch[i : i + WIKIDATA_BATCH_SIZE]
+            params = {
+                "action": "wbgetentities",
+                "ids": "|".join(batch),
+                "props": "aliases",
+                "languages": "en",
+                "format": "json",
+            }
+            json_response = self._request_json(WIKIDATA_API_URL, params=params) or {}
+            entities = json_response.get("entities", {})
+            for qid in batch:
+                entity = entities.get(qid)
+                if entity is None:
+                    continue
+                entity_aliases = [
+                    a["value"] for a in entity.get("aliases", {}).get("en", [])
+                ]
+                self.cache.set(("wikidata", qid), entity_aliases)
+                aliases[qid] = entity_aliases
+        return aliases
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_enrichment_client():
+    """process-wide client, so connections and cached responses are shared across saves"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = EnrichmentClient(ror_index=RorIndex())
+    return _client
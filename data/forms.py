@@ -0,0 +1,67 @@
+from django import forms
+from django.conf import settings
+
+
+class ApcImportForm(forms.Form):
+    file = forms.FileField(help_text="csv or jsonl")
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="show the changes without saving them",
+    )
+
+
+class PublisherIdWidget(forms.Select):
+    """select2 autocomplete for a plain publisher id column, fed by JournalAdmin's
+    publisher-autocomplete view. only the selected publisher is rendered as an option,
+    the rest are fetched a page at a time as the user types."""
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        from data.models import Publisher
+
+        self.choices = [("", "")]
+        if value not in (None, ""):
+            publisher = Publisher.objects.only("display_name").filter(pk=value).first()
+            label = f"{publisher.display_name} ({value})" if publisher else str(value)
+            self.choices.append((value, label))
+        return super().get_context(name, value, attrs)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        # the data attributes admin/js/autocomplete.js reads for autocomplete_fields
+        classes = [attrs.get("class"), "admin-autocomplete"]
+        attrs["class"] = " ".join(filter(None, classes))
+        attrs.update(
+            {
+                "data-ajax--cache": "true",
+                "data-ajax--delay": 250,
+                "data-ajax--type": "GET",
+                "data-ajax--url": self.url,
+                "data-theme": "admin-autocomplete",
+                "data-allow-clear": "true",
+                "data-placeholder": "search publishers by name or id",
+            }
+        )
+        return attrs
+
+    @property
+    def media(self):
+        extra = "" if settings.DEBUG else ".min"
+        return forms.Media(
+            js=(
+                f"admin/js/vendor/jquery/jquery{extra}.js",
+                f"admin/js/vendor/select2/select2.full{extra}.js",
+                "admin/js/jquery.init.js",
+                "admin/js/autocomplete.js",
+            ),
+            css={
+                "screen": (
+                    f"admin/css/vendor/select2/select2{extra}.css",
+                    "admin/css/autocomplete.css",
+                ),
+            },
+        )
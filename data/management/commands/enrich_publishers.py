@@ -0,0 +1,137 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from data.enrichment import (
+    EnrichmentError,
+    RateLimiter,
+    get_enrichment_client,
+)
+from data.models import Publisher
+from project.http import LatencyStats
+from project.utils import chunked
+
+ENRICHED_FIELDS = Publisher.ENRICHED_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Refresh alternate titles, country code and ROR id for publishers in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=10,
+            help="maximum requests per second to each upstream host",
+        )
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="only publishers without a ROR id, country code or alternate titles",
+        )
+        parser.add_argument(
+            "--since", help="only publishers created on or after this date"
+        )
+        parser.add_argument(
+            "--start-after",
+            type=int,
+            help="skip publishers up to this publisher_id, e.g. to resume a stopped run",
+        )
+
+    def handle(self, *args, **options):
+        qs = Publisher.objects.order_by("publisher_id")
+        if options["start_after"]:
+            qs = qs.filter(publisher_id__gt=options["start_after"])
+        if options["only_missing"]:
+            qs = qs.filter(
+                Q(ror_id__isnull=True)
+                | Q(country_code__isnull=True)
+                | Q(alternate_titles__isnull=True)
+            )
+        if options["since"]:
+            qs = qs.filter(created_date__gte=self.parse_since(options["since"]))
+
+        client = get_enrichment_client()
+        client.rate_limiter = RateLimiter(options["rate"])
+        client.stats = LatencyStats()
+
+        start = time.monotonic()
+        processed = updated = failed = 0
+        last_id = options["start_after"]
+        try:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                # iterator() streams rows through a server-side cursor on postgres
+                rows = qs.iterator(chunk_size=options["chunk_size"])
+                for chunk in chunked(rows, options["chunk_size"]):
+                    chunk_updated, chunk_failed = self.process_chunk(executor, chunk)
+                    processed += len(chunk)
+                    updated += chunk_updated
+                    failed += chunk_failed
+                    last_id = chunk[-1].publisher_id
+        except BaseException:
+            # one-off dynos have no disk that outlives the run, so the resume point
+            # goes to the logs
+            if last_id:
+                self.stderr.write(f"stopped; resume with --start-after {last_id}")
+            raise
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f"processed {processed} publishers in {elapsed:.1f}s "
+            f"({processed / elapsed if elapsed else 0:.1f} rows/s): "
+            f"{updated} updated, {failed} failed"
+        )
+        for host, (count, p50, p95) in sorted(client.stats.summary().items()):
+            self.stdout.write(
+                f"  {host}: {count} requests, p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms"
+            )
+        client.rate_limiter = None
+        client.stats = None
+
+    def process_chunk(self, executor, chunk):
+        # one wbgetentities request per 50 publishers, handed straight to enrich() so
+        # a chunk bigger than the client's cache doesn't fall back to one request each
+        try:
+            wikidata_aliases = get_enrichment_client().get_wikidata_aliases(
+                [p.wikidata_id for p in chunk if p.wikidata_id]
+            )
+        except EnrichmentError as e:
+            # each publisher asks again on its own, and fails on its own
+            self.stderr.write(f"batched wikidata lookup failed: {e}")
+            wikidata_aliases = None
+        results = list(executor.map(lambda p: self.enrich(p, wikidata_aliases), chunk))
+        changed = [p for p, result in zip(chunk, results) if result is True]
+        failed = results.count(None)
+        Publisher.objects.bulk_update(changed, ENRICHED_FIELDS)
+        self.stdout.write(
+            f"up to publisher_id {chunk[-1].publisher_id}: {len(changed)} updated"
+        )
+        return len(changed), failed
+
+    def enrich(self, publisher, wikidata_aliases=None):
+        """returns True if any field changed, False if not and None on error"""
+        before = [getattr(publisher, f) for f in ENRICHED_FIELDS]
+        try:
+            publisher.enrich(wikidata_aliases)
+        except Exception as e:
+            self.stderr.write(f"publisher {publisher.publisher_id} failed: {e}")
+            return None
+        return before != [getattr(publisher, f) for f in ENRICHED_FIELDS]
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f"could not parse --since {value!r}")
+            since = datetime.datetime.combine(date, datetime.time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
@@ -0,0 +1,49 @@
+import sys
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from project.exports import FORMATS, export_rows
+
+
+class Command(BaseCommand):
+    help = "Stream a model's rows to csv or jsonl, e.g. export_model data.Journal --filter apc_prices__isnull=False"
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="app_label.ModelName, e.g. data.Journal")
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--output", help="file to write to (defaults to stdout)")
+        parser.add_argument("--fields", help="comma separated field names")
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            help="lookup=value, may be repeated; 'True', 'False' and 'None' are converted",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        qs = model.objects.filter(**self.parse_filters(options["filter"]))
+        fields = options["fields"].split(",") if options["fields"] else None
+
+        out = open(options["output"], "w", newline="") if options["output"] else sys.stdout
+        try:
+            for chunk in export_rows(qs, fields, options["format"], options["chunk_size"]):
+                out.write(chunk)
+        finally:
+            if options["output"]:
+                out.close()
+
+    def parse_filters(self, filters):
+        constants = {"True": True, "False": False, "None": None}
+        lookups = {}
+        for item in filters:
+            if "=" not in item:
+                raise CommandError(f"--filter expects lookup=value, got {item!r}")
+            key, value = item.split("=", 1)
+            lookups[key] = constants.get(value, value)
+        return lookups
@@ -0,0 +1,281 @@
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from data.currency import compute_apc_usd_many, get_rate_table
+from data.models import Concept, Journal, Publisher, PublisherHierarchy
+from data.schema import create_external_tables
+from project.utils import chunked
+
+# row counts at --scale 1, roughly the size of the production tables
+BASE_COUNTS = {"publishers": 100000, "journals": 250000, "concepts": 65000}
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "CAD", "BRL", "INR", "CNY"]
+COUNTRIES = ["US", "GB", "DE", "NL", "JP", "CN", "FR", "BR", "IN", "CH", "AU", "CA"]
+WORDS = (
+    "academic applied archives association bulletin chemical clinical college "
+    "communications computing development digital ecology economics education "
+    "engineering environmental european frontiers global health history humanities "
+    "institute international journal letters materials medical methods modern "
+    "national nature physics press proceedings psychology quarterly research review "
+    "royal science scientific society studies systems technology transactions "
+    "university world"
+).split()
+WIKIDATA_URL = "https://www.wikidata.org/wiki/"
+WIKIPEDIA_URL = "https://en.wikipedia.org/wiki/"
+PUBLISHER_SUFFIXES = ["Press", "Publishing", "Publications", "Verlag", "Media", "Group"]
+
+
+def issn_check_digit(digits):
+    total = sum(int(d) * w for d, w in zip(digits, range(8, 1, -1)))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def random_issn(rng):
+    digits = f"{rng.randrange(10**7):07d}"
+    return f"{digits[:4]}-{digits[4:]}{issn_check_digit(digits)}"
+
+
+def random_title(rng, words=3):
+    return " ".join(w.capitalize() for w in rng.sample(WORDS, words))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the local database with synthetic journals, publisher hierarchies and "
+        "concepts at production scale"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=0.1,
+            help="fraction of production size (1 = %s)"
+            % ", ".join(f"{n} {k}" for k, n in BASE_COUNTS.items()),
+        )
+        parser.add_argument("--publishers", type=int, help="overrides --scale")
+        parser.add_argument("--journals", type=int, help="overrides --scale")
+        parser.add_argument("--concepts", type=int, help="overrides --scale")
+        parser.add_argument(
+            "--concept-json-kb",
+            type=int,
+            default=20,
+            help="approximate size of each concept's wikipedia_json",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="allow writing to a database that isn't sqlite",
+        )
+
+    def handle(self, *args, **options):
+        db = router.db_for_write(Journal)
+        if connections[db].vendor != "sqlite" and not options["force"]:
+            raise CommandError(
+                f"the {db!r} database is {connections[db].vendor}, not a local sqlite "
+                "database; pass --force if you really mean it"
+            )
+        # a blank local database: our own tables come from the migrations, the ones the
+        # pipeline owns are created from the models
+        call_command("migrate", database=db, verbosity=0)
+        created = create_external_tables(db)
+        if created:
+            self.stdout.write(f"created tables {', '.join(created)}")
+
+        self.rng = random.Random(options["seed"])
+        self.chunk_size = options["chunk_size"]
+        counts = {
+            k: options[k] if options[k] is not None else int(n * options["scale"])
+            for k, n in BASE_COUNTS.items()
+        }
+
+        for name, generate in (
+            ("publishers", self.generate_publishers),
+            ("journals", self.generate_journals),
+            ("concepts", self.generate_concepts),
+        ):
+            start = time.monotonic()
+            with transaction.atomic(using=db):
+                created = generate(counts[name], options)
+            self.stdout.write(
+                f"created {created} {name} in {time.monotonic() - start:.1f}s"
+            )
+
+        # bulk_create skips Publisher.save(), so the closure table is filled in one go
+        start = time.monotonic()
+        rows = PublisherHierarchy.objects.rebuild(chunk_size=self.chunk_size)
+        self.stdout.write(
+            f"rebuilt {rows} publisher hierarchy rows in {time.monotonic() - start:.1f}s"
+        )
+
+    def next_id(self, model):
+        pk = model._meta.pk.name
+        return (model.objects.aggregate(m=Max(pk))["m"] or 0) + 1
+
+    def bulk_create(self, model, objs):
+        count = 0
+        for chunk in chunked(objs, self.chunk_size):
+            model.objects.bulk_create(chunk)
+            count += len(chunk)
+        return count
+
+    def generate_publishers(self, count, options):
+        """a forest of publishers: about 10% top level, imprints under them, and
+        imprints of imprints"""
+        rng = self.rng
+        first_id = self.next_id(Publisher)
+        self.publisher_ids = list(range(first_id, first_id + count))
+        levels = {0: [], 1: []}
+
+        def publishers():
+            for publisher_id in self.publisher_ids:
+                roll = rng.random()
+                if roll < 0.1 or not levels[0]:
+                    level, parent = 0, None
+                elif roll < 0.7 or not levels[1]:
+                    level, parent = 1, rng.choice(levels[0])
+                else:
+                    level, parent = 2, rng.choice(levels[1])
+                if level < 2:
+                    levels[level].append(publisher_id)
+                suffix = rng.choice(PUBLISHER_SUFFIXES)
+                publisher = Publisher(
+                    publisher_id=publisher_id,
+                    display_name=f"{random_title(rng, 2)} {suffix} {publisher_id}",
+                    parent_publisher=parent,
+                    hierarchy_level=level,
+                    country_code=rng.choice(COUNTRIES),
+                    is_approved=rng.random() < 0.3,
+                )
+                if rng.random() < 0.4:
+                    publisher.wikidata_id = WIKIDATA_URL + self.random_qid()
+                if rng.random() < 0.3:
+                    publisher.ror_id = f"https://ror.org/0{rng.randrange(16**8):08x}"
+                if rng.random() < 0.3:
+                    publisher.alternate_titles = f'["{random_title(rng, 2)}"]'
+                publisher.update_search_document()
+                yield publisher
+
+        return self.bulk_create(Publisher, publishers())
+
+    def generate_journals(self, count, options):
+        rng = self.rng
+        publisher_ids = getattr(self, "publisher_ids", None) or list(
+            Publisher.objects.values_list("publisher_id", flat=True)[:100000]
+        )
+        rate_table = get_rate_table()
+        currencies = [c for c in CURRENCIES if c in rate_table.currencies]
+        first_id = self.next_id(Journal)
+        journal_ids = list(range(first_id, first_id + count))
+
+        # a few journals were merged into others, some of those again: A -> B -> C
+        # (always into a higher id, so there are no cycles)
+        merge_into = {}
+        for journal_id in rng.sample(journal_ids, len(journal_ids) // 50):
+            if journal_id < journal_ids[-1]:
+                merge_into[journal_id] = rng.randint(journal_id + 1, journal_ids[-1])
+
+        def journals():
+            for chunk in chunked(journal_ids, self.chunk_size):
+                batch = []
+                for journal_id in chunk:
+                    issn_count = rng.choice([1, 1, 2, 2, 3])
+                    issns = [random_issn(rng) for _ in range(issn_count)]
+                    journal = Journal(
+                        journal_id=journal_id,
+                        display_name=f"{random_title(rng)} {journal_id}",
+                        # most journals have few papers, a handful have millions
+                        paper_count=min(int(rng.paretovariate(1.1) * 20), 5 * 10**6),
+                        issn=issns[0],
+                        issns=issns,
+                        is_oa=rng.random() < 0.3,
+                        is_in_doaj=rng.random() < 0.15,
+                        type="repository" if rng.random() < 0.25 else "journal",
+                        merge_into_id=merge_into.get(journal_id),
+                    )
+                    if publisher_ids and rng.random() < 0.9:
+                        # big publishers own most journals
+                        index = int(rng.paretovariate(0.8)) - 1
+                        journal.publisher_id = publisher_ids[
+                            min(index, len(publisher_ids) - 1)
+                        ]
+                    if rng.random() < 0.4:
+                        journal.apc_found = True
+                        journal.apc_prices = [
+                            {
+                                "price": rng.randrange(200, 5000, 50),
+                                "currency": currency,
+                            }
+                            for currency in rng.sample(currencies, rng.randint(1, 3))
+                        ]
+                    batch.append(journal)
+                results = compute_apc_usd_many(
+                    [j.apc_prices for j in batch], rate_table
+                )
+                for journal, result in zip(batch, results):
+                    if result is not None:
+                        journal.apc_usd, journal.apc_usd_rate_date = result
+                yield from batch
+
+        created = 0
+        for chunk in chunked(journals(), self.chunk_size):
+            Journal.objects.bulk_create(chunk)
+            created += len(chunk)
+        return created
+
+    def random_qid(self):
+        return f"Q{self.rng.randrange(10**7)}"
+
+    def generate_concepts(self, count, options):
+        rng = self.rng
+        first_id = self.next_id(Concept)
+        extract_words = options["concept_json_kb"] * 1024 // 8
+
+        def concepts():
+            for field_of_study_id in range(first_id, first_id + count):
+                name = random_title(rng, rng.randint(1, 3))
+                qid = self.random_qid()
+                description = f"field of study about {name.lower()}"
+                concept = Concept(
+                    field_of_study_id=field_of_study_id,
+                    display_name=name,
+                    # a few broad concepts at the top, most at levels 2-5
+                    level=rng.choices(range(6), weights=[1, 30, 150, 300, 250, 150])[0],
+                    wikidata_id=WIKIDATA_URL + qid,
+                    wikipedia_id=WIKIPEDIA_URL + name.replace(" ", "_"),
+                    wikidata_json={
+                        "id": qid,
+                        "labels": {"en": {"language": "en", "value": name}},
+                        "claims": {
+                            f"P{rng.randrange(5000)}": [
+                                {"mainsnak": {"datavalue": {"value": qid}}}
+                                for qid in (self.random_qid(), self.random_qid())
+                            ]
+                            for _ in range(50)
+                        },
+                    },
+                    wikipedia_json={
+                        "query": {
+                            "pages": [
+                                {
+                                    "title": name,
+                                    "terms": {"description": [description]},
+                                    "extract": " ".join(
+                                        rng.choices(WORDS, k=extract_words)
+                                    ),
+                                }
+                            ]
+                        }
+                    },
+                )
+                concept.description = concept.parse_description()
+                yield concept
+
+        return self.bulk_create(Concept, concepts())
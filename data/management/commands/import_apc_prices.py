@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from data.apc_import import ApcFileError, ApcImport, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import APC prices from a csv or jsonl file with journal_id or issn, price, currency and apc_found"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "jsonl"))
+        parser.add_argument(
+            "--dry-run", action="store_true", help="report the changes without saving"
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or detect_format(options["path"])
+        with open(options["path"], "rb") as fp:
+            try:
+                rows = read_rows(fp, fmt)
+            except ApcFileError as e:
+                raise CommandError(f"could not read {options['path']}: {e}")
+        apc_import = ApcImport(rows).plan()
+        for line in apc_import.report_lines():
+            self.stdout.write(line)
+        if apc_import.errors:
+            raise CommandError("nothing was imported, fix the errors above first")
+        if not options["dry_run"]:
+            count = apc_import.apply()
+            self.stdout.write(self.style.SUCCESS(f"updated {count} journals"))
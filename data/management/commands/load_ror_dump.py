@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from data.ror_index import build_index, iter_json_array, open_dump
+
+
+class Command(BaseCommand):
+    help = "Load a ROR data dump (zip or json file) into the ror_organization and ror_lookup tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dump_path", help="path to the downloaded ROR data dump")
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        fp, member = open_dump(options["dump_path"])
+        self.stdout.write(f"loading {member}")
+        with fp:
+            count = build_index(iter_json_array(fp))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"indexed {count} organizations in {time.monotonic() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from data.models import Concept
+
+
+class Command(BaseCommand):
+    help = (
+        "Store Concept.description parsed from wikipedia_json for every concept. The "
+        "pipeline writes wikipedia_json without Concept.save(), so schedule this to run "
+        "after it loads concepts (daily from the Heroku scheduler)"
+    )
+
+    def handle(self, *args, **options):
+        # one UPDATE in the database, so the json never leaves it
+        updated = Concept.objects.refresh_descriptions()
+        self.stdout.write(self.style.SUCCESS(f"updated {updated} descriptions"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from data.models import PublisherHierarchy
+
+
+class Command(BaseCommand):
+    help = "Rebuild the publisher_hierarchy closure table from Publisher.parent_publisher"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = PublisherHierarchy.objects.rebuild(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"wrote {count} hierarchy rows"))
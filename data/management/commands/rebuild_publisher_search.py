@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from data.models import Publisher
+from project.utils import chunked
+
+
+class Command(BaseCommand):
+    help = "Recompute Publisher.search_document for every publisher"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        qs = Publisher.objects.only(
+            "publisher_id", "display_name", "alternate_titles", "search_document"
+        ).order_by("publisher_id")
+        updated = 0
+        for chunk in chunked(
+            qs.iterator(chunk_size=options["chunk_size"]), options["chunk_size"]
+        ):
+            changed = []
+            for publisher in chunk:
+                document = publisher.build_search_document()
+                if document != publisher.search_document:
+                    publisher.search_document = document
+                    changed.append(publisher)
+            Publisher.objects.bulk_update(changed, ["search_document"])
+            updated += len(changed)
+        self.stdout.write(self.style.SUCCESS(f"updated {updated} search documents"))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from data.currency import compute_apc_usd_many, conversion_currency, get_rate_table
+from data.models import Journal, validate_apc_prices
+from project.utils import chunked
+
+APC_FIELDS = ["apc_usd", "apc_usd_rate_date"]
+
+
+class Command(BaseCommand):
+    help = "Recompute apc_usd for every journal with apc_prices using the current rate table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="report counts without saving"
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        rate_table = get_rate_table()
+        qs = (
+            Journal.objects.filter(apc_prices__isnull=False)
+            .only("journal_id", "apc_prices", *APC_FIELDS)
+            .order_by("journal_id")
+        )
+        changed = unchanged = invalid = 0
+        for chunk in chunked(
+            qs.iterator(chunk_size=options["chunk_size"]), options["chunk_size"]
+        ):
+            valid = []
+            for journal in chunk:
+                error = self.validate(journal, rate_table)
+                if error:
+                    invalid += 1
+                    self.stderr.write(f"journal {journal.journal_id}: {error}")
+                else:
+                    valid.append(journal)
+
+            to_update = []
+            results = compute_apc_usd_many([j.apc_prices for j in valid], rate_table)
+            for journal, result in zip(valid, results):
+                if result is None or result == (
+                    journal.apc_usd,
+                    journal.apc_usd_rate_date,
+                ):
+                    unchanged += 1
+                    continue
+                journal.apc_usd, journal.apc_usd_rate_date = result
+                to_update.append(journal)
+            changed += len(to_update)
+            if not options["dry_run"]:
+                Journal.objects.bulk_update(to_update, APC_FIELDS)
+
+        self.stdout.write(
+            f"{changed} changed, {unchanged} unchanged, {invalid} invalid "
+            f"(rates as of {rate_table.date}, {time.monotonic() - start:.1f}s)"
+            + (" [dry run]" if options["dry_run"] else "")
+        )
+
+    def validate(self, journal, rate_table):
+        """same rules as Journal.clean(), plus a currency we have a rate for"""
+        try:
+            validate_apc_prices(journal.apc_prices)
+        except ValidationError as e:
+            return e.messages[0]
+        currency = conversion_currency(journal.apc_prices)
+        if currency is not None and currency not in rate_table.currencies:
+            return f"{currency} is not a supported currency"
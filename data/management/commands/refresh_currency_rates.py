@@ -0,0 +1,28 @@
+from currency_converter import ECB_URL
+from django.core.management.base import BaseCommand
+
+from data.currency import RateTable, refresh_rate_table
+from data.models import CurrencyRates
+from project.http import get_session
+
+
+class Command(BaseCommand):
+    help = "Download the latest ECB exchange rates used to compute apc_usd (run daily from the scheduler)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default=ECB_URL)
+
+    def handle(self, *args, **options):
+        r = get_session().get(options["url"])
+        r.raise_for_status()
+        # parsing fails before anything is stored if the download is broken
+        table = RateTable.from_zip(r.content)
+        # stored in the database, every web and worker process picks it up within
+        # a minute
+        CurrencyRates.objects.store(table)
+        refresh_rate_table()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"stored rates for {len(table.currencies)} currencies as of {table.date}"
+            )
+        )
@@ -0,0 +1,97 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project.benchmarks import BenchmarkRunner, compare
+
+
+class Command(BaseCommand):
+    help = (
+        "Time saves, syncs and changelists against sqlite and fake upstream services. "
+        "Run with --settings=project.settings_benchmark"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--latency", type=float, default=20, help="fake upstream latency in ms"
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=3,
+            help="rounds over all operations, latency is the best of their medians",
+        )
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--only", action="append", help="run just this operation, can be repeated"
+        )
+        parser.add_argument("--save", help="write the results to this json file")
+        parser.add_argument("--compare", help="compare with a saved json baseline")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            help="p50 slowdown that counts with --fail-on-latency (default 0.5 = 50%%)",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="exit with an error if --compare finds more queries or outbound calls",
+        )
+        parser.add_argument(
+            "--fail-on-latency",
+            action="store_true",
+            help="also count p50 slowdowns past --threshold as regressions",
+        )
+
+    def handle(self, *args, **options):
+        # it drops and creates tables and replaces the outbound transport
+        if not getattr(settings, "BENCHMARK_MODE", False):
+            raise CommandError("run with --settings=project.settings_benchmark")
+
+        runner = BenchmarkRunner(
+            latency=options["latency"] / 1000,
+            iterations=options["iterations"],
+            runs=options["runs"],
+            rows=options["rows"],
+            seed=options["seed"],
+        )
+        result = runner.run(only=options["only"])
+
+        self.stdout.write(
+            f"{'operation':<22} {'p50 ms':>9} {'max ms':>9} {'calls':>7} {'queries':>8}"
+        )
+        for name, r in result["results"].items():
+            self.stdout.write(
+                f"{name:<22} {r['p50_ms']:>9.1f} {r['max_ms']:>9.1f} "
+                f"{r['calls']:>7} {r['queries']:>8}"
+            )
+
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump(result, f, indent=2, sort_keys=True)
+                f.write("\n")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            if baseline["meta"] != result["meta"]:
+                self.stderr.write(
+                    f"baseline was run with {baseline['meta']}, latencies may not compare"
+                )
+            regressed = []
+            for name, message, is_regression in compare(
+                baseline,
+                result,
+                options["threshold"],
+                gate_latency=options["fail_on_latency"],
+            ):
+                style = self.style.ERROR if is_regression else str
+                self.stdout.write(style(f"{name}: {message}"))
+                if is_regression:
+                    regressed.append(name)
+            if regressed and options["fail_on_regression"]:
+                raise CommandError(f"regressions in {', '.join(regressed)}")
@@ -0,0 +1,86 @@
+# concept, journal and publisher as they were when this app started migrating its
+# tables. they belong to the openalex pipeline, so OpenAlexDbRouter keeps these
+# operations out of the database; they only give later migrations a state to build on.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Concept',
+            fields=[
+                ('field_of_study_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('display_name', models.CharField(max_length=255)),
+                ('level', models.IntegerField()),
+                ('wikidata_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('wikipedia_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('wikidata_json', models.JSONField(blank=True, editable=False, null=True)),
+                ('wikipedia_json', models.JSONField(blank=True, editable=False, null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Concept',
+                'verbose_name_plural': 'Concepts',
+                'db_table': 'concept',
+            },
+        ),
+        migrations.CreateModel(
+            name='Journal',
+            fields=[
+                ('journal_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('display_name', models.CharField(max_length=255)),
+                ('publisher_id', models.BigIntegerField(blank=True, null=True)),
+                ('issn', models.CharField(blank=True, max_length=10, null=True)),
+                ('apc_prices', models.JSONField(blank=True, null=True)),
+                ('apc_usd', models.IntegerField(blank=True, null=True)),
+                ('apc_found', models.BooleanField(blank=True, null=True)),
+                ('merge_into_id', models.BigIntegerField(blank=True, null=True)),
+                ('webpage', models.CharField(blank=True, max_length=255, null=True)),
+                ('issns', models.JSONField(blank=True, null=True)),
+                ('is_oa', models.BooleanField(blank=True, null=True)),
+                ('is_in_doaj', models.BooleanField(blank=True, null=True)),
+                ('match_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('type', models.CharField(blank=True, max_length=255, null=True)),
+                ('fatcat_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('wikidata_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('paper_count', models.IntegerField(blank=True, null=True)),
+                ('institution_id', models.BigIntegerField(blank=True, null=True)),
+                ('publisher_not_found', models.BooleanField(blank=True, null=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Journal',
+                'verbose_name_plural': 'Journals',
+                'db_table': 'journal',
+                'ordering': ['-paper_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Publisher',
+            fields=[
+                ('publisher_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('display_name', models.CharField(max_length=255)),
+                ('alternate_titles', models.CharField(blank=True, max_length=255, null=True)),
+                ('wikidata_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('country_code', models.CharField(blank=True, max_length=255, null=True)),
+                ('parent_publisher', models.BigIntegerField(blank=True, null=True)),
+                ('ror_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('hierarchy_level', models.IntegerField(blank=True, null=True)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Publisher',
+                'verbose_name_plural': 'Publishers',
+                'db_table': 'publisher',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RorLookup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=16)),
+                ('key', models.TextField()),
+                ('ror_id', models.CharField(max_length=32)),
+            ],
+            options={
+                'verbose_name': 'ROR lookup',
+                'verbose_name_plural': 'ROR lookups',
+                'db_table': 'ror_lookup',
+                'indexes': [models.Index(fields=['kind', 'key'], name='ror_lookup_kind_9fab68_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RorOrganization',
+            fields=[
+                ('ror_id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('name', models.TextField(blank=True, null=True)),
+                ('aliases', models.JSONField(default=list)),
+                ('country_code', models.CharField(blank=True, max_length=2, null=True)),
+            ],
+            options={
+                'verbose_name': 'ROR organization',
+                'verbose_name_plural': 'ROR organizations',
+                'db_table': 'ror_organization',
+            },
+        ),
+    ]
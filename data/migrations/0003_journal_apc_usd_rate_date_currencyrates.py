@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+from data.schema import add_columns, remove_columns
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0002_rororganization_rorlookup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journal',
+            name='apc_usd_rate_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        # ALTER TABLE journal ADD COLUMN apc_usd_rate_date date NULL
+        migrations.RunPython(
+            add_columns('journal', 'apc_usd_rate_date'),
+            remove_columns('journal', 'apc_usd_rate_date'),
+        ),
+        migrations.CreateModel(
+            name='CurrencyRates',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('rates', models.JSONField()),
+                ('fetched', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Currency rates',
+                'verbose_name_plural': 'Currency rates',
+                'db_table': 'currency_rates',
+            },
+        ),
+    ]
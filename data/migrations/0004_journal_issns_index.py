@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from data.schema import run_on_postgresql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0003_journal_apc_usd_rate_date_currencyrates'),
+    ]
+
+    operations = [
+        # JournalQuerySet.with_issns() matches issn exactly and issns with jsonb
+        # containment (issns @> '["NNNN-NNNC"]'); postgres keeps both indexes up to
+        # date for rows the pipeline writes
+        migrations.RunPython(
+            run_on_postgresql(
+                'CREATE INDEX IF NOT EXISTS journal_issn_exact ON journal (issn)',
+                'CREATE INDEX IF NOT EXISTS journal_issns_gin '
+                'ON journal USING gin (issns jsonb_path_ops)',
+            ),
+            run_on_postgresql(
+                'DROP INDEX IF EXISTS journal_issn_exact',
+                'DROP INDEX IF EXISTS journal_issns_gin',
+            ),
+        ),
+    ]
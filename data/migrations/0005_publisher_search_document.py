@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+from data.schema import add_columns, remove_columns, run_on_postgresql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0004_journal_issns_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        # ALTER TABLE publisher ADD COLUMN search_document text NULL
+        migrations.RunPython(
+            add_columns('publisher', 'search_document'),
+            remove_columns('publisher', 'search_document'),
+        ),
+        # search_publishers() filters with search_document LIKE '%term%' and the
+        # pg_trgm word similarity operator, both of which use the first index, and
+        # with display_name__icontains, i.e. upper(display_name::text) LIKE, which
+        # uses the second one
+        migrations.RunPython(
+            run_on_postgresql(
+                'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+                'CREATE INDEX IF NOT EXISTS publisher_search_document_trgm '
+                'ON publisher USING gin (search_document gin_trgm_ops)',
+                'CREATE INDEX IF NOT EXISTS publisher_display_name_trgm '
+                'ON publisher USING gin (upper(display_name::text) gin_trgm_ops)',
+            ),
+            run_on_postgresql(
+                'DROP INDEX IF EXISTS publisher_search_document_trgm',
+                'DROP INDEX IF EXISTS publisher_display_name_trgm',
+            ),
+        ),
+    ]
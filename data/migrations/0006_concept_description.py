@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models.fields.json import KT
+
+from data.schema import add_columns, remove_columns, table_columns
+
+
+def fill_descriptions(apps, schema_editor):
+    # the same path Concept.parse_description() reads, computed by the database; later
+    # pipeline loads are picked up by manage.py rebuild_concept_descriptions
+    Concept = apps.get_model('data', 'Concept')
+    if table_columns(schema_editor, Concept._meta.db_table) is None:
+        return
+    Concept.objects.using(schema_editor.connection.alias).filter(
+        description__isnull=True, wikipedia_json__isnull=False
+    ).update(description=KT('wikipedia_json__query__pages__0__terms__description__0'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0005_publisher_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concept',
+            name='description',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        # ALTER TABLE concept ADD COLUMN description text NULL
+        migrations.RunPython(
+            add_columns('concept', 'description'),
+            remove_columns('concept', 'description'),
+        ),
+        migrations.RunPython(fill_descriptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0006_concept_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublisherHierarchy',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('depth', models.IntegerField()),
+                ('ancestor', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='descendant_links', to='data.publisher')),
+                ('descendant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ancestor_links', to='data.publisher')),
+            ],
+            options={
+                'verbose_name': 'Publisher hierarchy',
+                'verbose_name_plural': 'Publisher hierarchy',
+                'db_table': 'publisher_hierarchy',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='publisher_h_descend_3f014a_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+    ]
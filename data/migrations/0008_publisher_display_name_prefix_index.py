@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from data.schema import run_on_postgresql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0007_publisherhierarchy'),
+    ]
+
+    operations = [
+        # publisher_autocomplete_page() filters with upper(display_name) LIKE 'TERM%',
+        # which only a pattern_ops index can serve outside the C locale
+        migrations.RunPython(
+            run_on_postgresql(
+                'CREATE INDEX IF NOT EXISTS publisher_display_name_upper_prefix '
+                'ON publisher (upper(display_name) text_pattern_ops, publisher_id)',
+            ),
+            run_on_postgresql(
+                'DROP INDEX IF EXISTS publisher_display_name_upper_prefix'
+            ),
+        ),
+    ]
@@ -1,11 +1,52 @@
 import json
+import re
 
-import requests
-
-from currency_converter import CurrencyConverter
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import F, Q
+from django.db.models.fields.json import KT
 from django.core.exceptions import ValidationError
 
+from data.cache import TTLCache
+from data.currency import get_rate_table
+from data.enrichment import (
+    EnrichmentError,
+    get_enrichment_client,
+    normalize_wikidata_id,
+)
+from data.search import invalidate_publisher_search_index
+from data.utils import normalize_name
+from project.utils import chunked
+
+# marks a field that wasn't loaded, so its old value is unknown
+_not_loaded = object()
+
+# the biggest hierarchies, for the admin's top-level parent filter. counting them
+# reads the whole closure table, so it's done at most every few minutes per process
+_top_level_parents = TTLCache(maxsize=8, ttl=300)
+
+
+def invalidate_top_level_parents():
+    _top_level_parents.clear()
+
+
+class ConceptManager(models.Manager):
+    def refresh_descriptions(self):
+        """store the description parsed from wikipedia_json wherever it differs, in one
+        UPDATE. returns the number of rows changed."""
+        parsed = KT("wikipedia_json__query__pages__0__terms__description__0")
+        return (
+            self.annotate(parsed_description=parsed)
+            .filter(
+                Q(description__isnull=True, parsed_description__isnull=False)
+                | Q(description__isnull=False, parsed_description__isnull=True)
+                | (
+                    Q(description__isnull=False, parsed_description__isnull=False)
+                    & ~Q(description=F("parsed_description"))
+                )
+            )
+            .update(description=parsed)
+        )
+
 
 class Concept(models.Model):
     field_of_study_id = models.BigIntegerField(primary_key=True)
@@ -15,14 +56,24 @@ class Concept(models.Model):
     wikipedia_id = models.CharField(max_length=255, blank=True, null=True)
     wikidata_json = models.JSONField(blank=True, null=True, editable=False)
     wikipedia_json = models.JSONField(blank=True, null=True, editable=False)
+    # parsed from wikipedia_json, so reading it doesn't need the big json column. save()
+    # keeps it current, but the pipeline writes wikipedia_json directly, so
+    # rebuild_concept_descriptions has to run after each of its loads
+    description = models.TextField(blank=True, null=True, editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
 
+    objects = ConceptManager()
+
     def __str__(self):
         return self.display_name
 
-    @property
-    def description(self):
+    def save(self, *args, **kwargs):
+        if "wikipedia_json" not in self.get_deferred_fields():
+            self.description = self.parse_description()
+        super().save(*args, **kwargs)
+
+    def parse_description(self):
         if self.wikipedia_json:
             try:
                 parsed_description = (
@@ -31,7 +82,7 @@ class Concept(models.Model):
                     .get("terms", "")
                     .get("description", "")[0]
                 )
-            except IndexError:
+            except (IndexError, KeyError, AttributeError):
                 parsed_description = None
             return parsed_description
 
@@ -52,21 +103,118 @@ class Publisher(models.Model):
     hierarchy_level = models.IntegerField(blank=True, null=True)
     is_approved = models.BooleanField(default=False)
     created_date = models.DateTimeField(auto_now_add=True)
+    # normalized display name and alternate titles, trigram indexed for admin search
+    search_document = models.TextField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return self.display_name
 
-    def save(self, *args, **kwargs):
+    # enrichment only depends on these, so it is skipped when none of them changed
+    ENRICHMENT_FIELDS = ("wikidata_id", "ror_id", "display_name")
+    # fields written by enrich()
+    ENRICHED_FIELDS = ["alternate_titles", "country_code", "ror_id", "search_document"]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_enrichment_fields()
+        instance._loaded_parent_publisher = instance.__dict__.get(
+            "parent_publisher", _not_loaded
+        )
+        return instance
+
+    def _snapshot_enrichment_fields(self):
+        # read from __dict__ so deferred fields aren't fetched just to snapshot them
+        self._loaded_enrichment_values = {
+            f: self.__dict__[f] for f in self.ENRICHMENT_FIELDS if f in self.__dict__
+        }
+
+    def enrichment_fields_changed(self):
+        loaded = getattr(self, "_loaded_enrichment_values", None)
+        if loaded is None:
+            # new object
+            return True
+        for f in self.ENRICHMENT_FIELDS:
+            if f in self.__dict__ and (
+                f not in loaded or self.__dict__[f] != loaded[f]
+            ):
+                return True
+        return False
+
+    def parent_changed(self):
+        if "parent_publisher" not in self.__dict__:
+            return False
+        loaded = getattr(self, "_loaded_parent_publisher", _not_loaded)
+        return loaded is _not_loaded or loaded != self.parent_publisher
+
+    def save(self, *args, enrich=True, force_enrich=False, **kwargs):
         if not self.hierarchy_level:
             self.hierarchy_level = 0
-        self.alternate_titles = self.get_alternate_titles()
-        self.country_code = self.get_country_code()
-        if not self.ror_id:
-            self.ror_id = self.find_ror_id()
+        if force_enrich or (enrich and self.enrichment_fields_changed()):
+            self.enrich()
+        self.update_search_document()
+        update_fields = kwargs.get("update_fields")
+        sync_hierarchy = self.parent_changed() and (
+            update_fields is None or "parent_publisher" in update_fields
+        )
         super(Publisher, self).save(*args, **kwargs)
+        if sync_hierarchy:
+            PublisherHierarchy.objects.sync(self)
+        self._snapshot_enrichment_fields()
+        self._loaded_parent_publisher = self.parent_publisher
+        invalidate_publisher_search_index()
 
-    def get_alternate_titles(self):
-        wikidata_alternate_titles = self.get_wikidata_alternate_titles()
+    def clean(self):
+        super().clean()
+        if self.parent_publisher is None or not self.publisher_id:
+            return
+        is_descendant = PublisherHierarchy.objects.filter(
+            ancestor_id=self.publisher_id, descendant_id=self.parent_publisher
+        ).exists()
+        if self.parent_publisher == self.publisher_id or is_descendant:
+            raise ValidationError(
+                {"parent_publisher": "A publisher can't be its own parent or ancestor."}
+            )
+
+    def enrich(self, wikidata_aliases=None):
+        """fill alternate_titles, country_code and ror_id from ROR and Wikidata.
+
+        wikidata_aliases is an optional {qid: aliases} dict already fetched for a batch
+        of publishers with get_wikidata_aliases(). if ROR or Wikidata can't be reached
+        the fields are left as they were and EnrichmentError is raised, so a job retries
+        instead of saving empty values over good ones."""
+        before = {f: getattr(self, f) for f in self.ENRICHED_FIELDS}
+        try:
+            # find the ror id first so a newly found one is used for titles and country
+            if not self.ror_id:
+                self.ror_id = self.find_ror_id()
+            self.alternate_titles = self.get_alternate_titles(wikidata_aliases)
+            self.country_code = self.get_country_code()
+        except EnrichmentError:
+            for f, value in before.items():
+                setattr(self, f, value)
+            raise
+        self.update_search_document()
+
+    def build_search_document(self):
+        titles = [self.display_name or ""]
+        if self.alternate_titles:
+            try:
+                titles.extend(json.loads(self.alternate_titles))
+            except (TypeError, ValueError):
+                titles.append(self.alternate_titles)
+        normalized = [normalize_name(t) for t in titles]
+        return "\n".join(dict.fromkeys(t for t in normalized if t))
+
+    def update_search_document(self):
+        self.search_document = self.build_search_document()
+
+    @property
+    def enrichment_job_key(self):
+        return f"enrich_publisher:{self.publisher_id}"
+
+    def get_alternate_titles(self, wikidata_aliases=None):
+        wikidata_alternate_titles = self.get_wikidata_alternate_titles(wikidata_aliases)
         ror_alternate_titles = self.get_ror_alternate_titles()
         alternate_titles = []
         if wikidata_alternate_titles:
@@ -77,87 +225,43 @@ class Publisher(models.Model):
         alternate_titles = list(set(alternate_titles))
         return json.dumps(alternate_titles)
 
-    def get_wikidata_alternate_titles(self):
-        if self.wikidata_id:
-            wikidata_id = (
-                self.wikidata_id.replace("https://wikidata.org/entity/", "")
-                .replace("https://www.wikidata.org/entity/", "")
-                .replace("https://wikidata.org/wiki/", "")
-                .replace("https://www.wikidata.org/wiki/", "")
+    @property
+    def wikidata_qid(self):
+        return normalize_wikidata_id(self.wikidata_id)
+
+    def get_wikidata_alternate_titles(self, wikidata_aliases=None):
+        if not self.wikidata_qid:
+            return None
+        if wikidata_aliases is None or self.wikidata_qid not in wikidata_aliases:
+            wikidata_aliases = get_enrichment_client().get_wikidata_aliases(
+                [self.wikidata_qid]
             )
-            url = f"https://www.wikidata.org/w/api.php?action=wbgetentities&ids={wikidata_id}&languages=en&format=json"
-            response = requests.get(url)
-            if response.status_code == 200:
-                json_response = response.json()
-                try:
-                    alises = (
-                        json_response.get("entities", {})
-                        .get(wikidata_id, {})
-                        .get("aliases", {})
-                        .get("en", [])
-                    )
-                    alternate_titles = [a["value"] for a in alises]
-                    return alternate_titles
-                except IndexError:
-                    return None
+        return wikidata_aliases.get(self.wikidata_qid)
 
-    def get_ror_alternate_titles(self):
+    def get_ror_organization(self):
         if self.ror_id:
-            url = f"https://api.ror.org/organizations/{self.ror_id}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                json_response = response.json()
-                try:
-                    alternate_titles = json_response.get("aliases", [])
-                    return alternate_titles
-                except IndexError:
-                    return None
+            return get_enrichment_client().get_ror_organization(self.ror_id)
+
+    def get_ror_alternate_titles(self):
+        organization = self.get_ror_organization()
+        if organization is not None:
+            return organization.get("aliases", [])
 
     def get_country_code(self):
-        if self.ror_id:
-            url = f"https://api.ror.org/organizations/{self.ror_id}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                json_response = response.json()
-                try:
-                    country_code = json_response.get("country", {}).get(
-                        "country_code", None
-                    )
-                    return country_code
-                except IndexError:
-                    return None
+        organization = self.get_ror_organization()
+        if organization is not None:
+            return organization.get("country", {}).get("country_code", None)
 
     def find_ror_id(self):
+        client = get_enrichment_client()
         # search by wikidata id
-        if self.wikidata_id:
-            wikidata_id = (
-                self.wikidata_id.replace("https://wikidata.org/entity/", "")
-                .replace("https://www.wikidata.org/entity/", "")
-                .replace("https://wikidata.org/wiki/", "")
-                .replace("https://www.wikidata.org/wiki/", "")
-            )
-            url = f"https://api.ror.org/organizations?query={wikidata_id}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                json_response = response.json()
-                try:
-                    ror_id = json_response.get("items", [])[0].get("id", None)
-                    return ror_id
-                except IndexError:
-                    return None
+        if self.wikidata_qid:
+            ror_id = client.find_ror_id_by_wikidata_id(self.wikidata_qid)
+            if ror_id:
+                return ror_id
 
         # then search by name
-        url = 'https://api.ror.org/organizations?query="{display_name}"'.format(
-            display_name=self.display_name
-        )
-        response = requests.get(url)
-        if response.status_code == 200:
-            json_response = response.json()
-            try:
-                ror_id = json_response.get("items", [])[0].get("id", None)
-                return ror_id
-            except IndexError:
-                return None
+        return client.find_ror_id_by_name(self.display_name)
 
     class Meta:
         verbose_name = "Publisher"
@@ -165,6 +269,217 @@ class Publisher(models.Model):
         db_table = "publisher"
 
 
+ISSN_RE = re.compile(r"^\s*(\d{4})-?(\d{3}[\dX])\s*$", re.IGNORECASE)
+
+
+def normalize_issn(value):
+    """return value as NNNN-NNNC, or None if it doesn't look like an issn"""
+    match = ISSN_RE.match(str(value))
+    if match is None:
+        return None
+    return f"{match.group(1)}-{match.group(2).upper()}"
+
+
+def validate_apc_prices(apc_prices):
+    """raise ValidationError unless apc_prices is a list of {"price": int, "currency": "XXX"}"""
+    try:
+        if apc_prices:  # if apc_prices is not None or not empty
+            # validate each item in the list
+            for item in apc_prices:
+                if (
+                    not isinstance(item, dict)
+                    or "price" not in item
+                    or "currency" not in item
+                ):
+                    raise ValidationError(
+                        'Invalid format for apc_prices. Each item must be a dictionary with "price" and "currency" keys'
+                    )
+                if not isinstance(item["price"], int):
+                    raise ValidationError(
+                        "Invalid format for apc_prices. Price should be an integer."
+                    )
+                if not isinstance(item["currency"], str) or len(item["currency"]) != 3:
+                    raise ValidationError(
+                        "Invalid format for apc_prices. Currency should be a string that is three letters long."
+                    )
+    except json.JSONDecodeError:
+        raise ValidationError("apc_prices should be a valid JSON string.")
+
+
+class PublisherHierarchyManager(models.Manager):
+    def sync(self, publisher):
+        """move publisher and its subtree under its current parent_publisher, and
+        update their hierarchy_level to match"""
+        publisher_id = publisher.publisher_id
+        parent_id = publisher.parent_publisher
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            subtree = dict(
+                self.filter(ancestor_id=publisher_id).values_list(
+                    "descendant_id", "depth"
+                )
+            )
+            if publisher_id not in subtree:
+                self.create(
+                    ancestor_id=publisher_id, descendant_id=publisher_id, depth=0
+                )
+                subtree[publisher_id] = 0
+            # detach the subtree from its old ancestors
+            self.filter(descendant_id__in=list(subtree)).exclude(
+                ancestor_id__in=list(subtree)
+            ).delete()
+            invalidate_top_level_parents()
+            if parent_id is None or parent_id in subtree:
+                # a cycle ends up as a root; Publisher.clean() keeps these out of
+                # the admin
+                ancestors = []
+            else:
+                ancestors = list(
+                    self.filter(descendant_id=parent_id).values_list(
+                        "ancestor_id", "depth"
+                    )
+                )
+            self.bulk_create(
+                [
+                    PublisherHierarchy(
+                        ancestor_id=ancestor_id,
+                        descendant_id=descendant_id,
+                        depth=ancestor_depth + descendant_depth + 1,
+                    )
+                    for ancestor_id, ancestor_depth in ancestors
+                    for descendant_id, descendant_depth in subtree.items()
+                ]
+            )
+            # the parent's root is its deepest ancestor; no ancestors makes a root
+            level = max((depth for _, depth in ancestors), default=-1) + 1
+            by_level = {}
+            for descendant_id, descendant_depth in subtree.items():
+                by_level.setdefault(level + descendant_depth, []).append(descendant_id)
+            for descendant_level, ids in by_level.items():
+                Publisher.objects.filter(publisher_id__in=ids).update(
+                    hierarchy_level=descendant_level
+                )
+            publisher.hierarchy_level = level
+
+    def rebuild(self, chunk_size=5000):
+        """recompute every row, and every hierarchy_level that is off, from
+        Publisher.parent_publisher. returns the row count"""
+        parents = {}
+        old_levels = {}
+        for publisher_id, parent_id, level in Publisher.objects.values_list(
+            "publisher_id", "parent_publisher", "hierarchy_level"
+        ).iterator(chunk_size=chunk_size):
+            parents[publisher_id] = parent_id
+            old_levels[publisher_id] = level
+        levels = {}
+
+        def rows():
+            for publisher_id in parents:
+                yield PublisherHierarchy(
+                    ancestor_id=publisher_id, descendant_id=publisher_id, depth=0
+                )
+                seen = {publisher_id}
+                current, depth = publisher_id, 0
+                # parents that don't exist end the chain, like they do in sync()
+                while parents.get(current) in parents and parents[current] not in seen:
+                    current = parents[current]
+                    depth += 1
+                    seen.add(current)
+                    yield PublisherHierarchy(
+                        ancestor_id=current, descendant_id=publisher_id, depth=depth
+                    )
+                levels[publisher_id] = depth
+
+        count = 0
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            self.all().delete()
+            for chunk in chunked(rows(), chunk_size):
+                self.bulk_create(chunk)
+                count += len(chunk)
+            changed = {}
+            for publisher_id, level in levels.items():
+                if old_levels[publisher_id] != level:
+                    changed.setdefault(level, []).append(publisher_id)
+            for level, ids in changed.items():
+                for chunk in chunked(ids, chunk_size):
+                    Publisher.objects.filter(publisher_id__in=chunk).update(
+                        hierarchy_level=level
+                    )
+        invalidate_top_level_parents()
+        return count
+
+    def top_level_parents(self, limit):
+        """[(publisher_id, display_name, descendant count)] for the `limit` biggest
+        hierarchies, cached for a few minutes"""
+        cached = _top_level_parents.get(limit)
+        if cached is None:
+            rows = (
+                self.filter(ancestor__parent_publisher__isnull=True, depth__gt=0)
+                .values("ancestor_id", "ancestor__display_name")
+                .annotate(size=models.Count("id"))
+                .order_by("-size")[:limit]
+            )
+            cached = [
+                (r["ancestor_id"], r["ancestor__display_name"], r["size"]) for r in rows
+            ]
+            _top_level_parents.set(limit, cached)
+        return cached
+
+    def descendant_ids(self, publisher_id):
+        return self.filter(ancestor_id=publisher_id).values("descendant_id")
+
+
+class PublisherHierarchy(models.Model):
+    """closure table of the publisher hierarchy: one row for every publisher and each
+    of its ancestors (and itself, at depth 0), so a whole subtree or ancestor chain
+    is one indexed query. kept up to date by Publisher.save()."""
+
+    id = models.BigAutoField(primary_key=True)
+    ancestor = models.ForeignKey(
+        Publisher,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="descendant_links",
+    )
+    descendant = models.ForeignKey(
+        Publisher,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="ancestor_links",
+    )
+    depth = models.IntegerField()
+
+    objects = PublisherHierarchyManager()
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
+    class Meta:
+        verbose_name = "Publisher hierarchy"
+        verbose_name_plural = "Publisher hierarchy"
+        db_table = "publisher_hierarchy"
+        unique_together = [("ancestor", "descendant")]
+        indexes = [models.Index(fields=["descendant", "depth"])]
+
+
+class JournalQuerySet(models.QuerySet):
+    def with_issns(self, issns):
+        """journals whose issn or issns field holds any of issns, given as NNNN-NNNC.
+
+        on postgres issns is matched with jsonb containment, which the GIN index from
+        data migration 0004 serves, so rows the pipeline writes are found right away"""
+        issns = sorted(set(issns))
+        if not issns:
+            return self.none()
+        condition = Q(issn__in=issns)
+        for issn in issns:
+            if connections[self.db].vendor == "postgresql":
+                condition |= Q(issns__contains=[issn])
+            else:
+                # sqlite has no json containment, match the quoted value instead
+                condition |= Q(issns__icontains=f'"{issn}"')
+        return self.filter(condition)
+
+
 class Journal(models.Model):
     journal_id = models.BigAutoField(primary_key=True)
     display_name = models.CharField(max_length=255)
@@ -172,6 +487,7 @@ class Journal(models.Model):
     issn = models.CharField(max_length=10, blank=True, null=True)
     apc_prices = models.JSONField(blank=True, null=True)
     apc_usd = models.IntegerField(blank=True, null=True)
+    apc_usd_rate_date = models.DateField(blank=True, null=True)
     apc_found = models.BooleanField(blank=True, null=True)
     merge_into_id = models.BigIntegerField(blank=True, null=True)
     webpage = models.CharField(max_length=255, blank=True, null=True)
@@ -187,37 +503,14 @@ class Journal(models.Model):
     publisher_not_found = models.BooleanField(blank=True, null=True)
     updated_date = models.DateTimeField(auto_now=True)
 
+    objects = JournalQuerySet.as_manager()
+
     def __str__(self):
         return self.display_name
 
     def clean(self):
         super().clean()  # keeps the parent class clean() behavior
-
-        try:
-            if self.apc_prices:  # if apc_prices is not None or not empty
-                # validate each item in the list
-                for item in self.apc_prices:
-                    if (
-                        not isinstance(item, dict)
-                        or "price" not in item
-                        or "currency" not in item
-                    ):
-                        raise ValidationError(
-                            'Invalid format for apc_prices. Each item must be a dictionary with "price" and "currency" keys'
-                        )
-                    if not isinstance(item["price"], int):
-                        raise ValidationError(
-                            "Invalid format for apc_prices. Price should be an integer."
-                        )
-                    if (
-                        not isinstance(item["currency"], str)
-                        or len(item["currency"]) != 3
-                    ):
-                        raise ValidationError(
-                            "Invalid format for apc_prices. Currency should be a string that is three letters long."
-                        )
-        except json.JSONDecodeError:
-            raise ValidationError("apc_prices should be a valid JSON string.")
+        validate_apc_prices(self.apc_prices)
 
     # set apc_usd based on apc_prices. Use the USD price if available, if not convert to USD using the exchange rate
     def set_apc_usd(self):
@@ -226,22 +519,102 @@ class Journal(models.Model):
             for item in self.apc_prices:
                 if item["currency"] == "USD":
                     self.apc_usd = item["price"]
+                    self.apc_usd_rate_date = None
                     break
 
-        # if still not set, convert using the first available currency and convert using currency_converter
+        # if still not set, convert the first available currency using the shared rate table
         if not self.apc_usd and self.apc_prices:
             currency = self.apc_prices[0]["currency"]
             price = self.apc_prices[0]["price"]
-            c = CurrencyConverter()
-            self.apc_usd = c.convert(price, currency, "USD")
+            rate_table = get_rate_table()
+            self.apc_usd = rate_table.convert(price, currency)
+            self.apc_usd_rate_date = rate_table.date
 
     def save(self, *args, **kwargs):
         self.clean()
         self.set_apc_usd()
         super().save(*args, **kwargs)  # Call the "real" save() method.
 
+    @property
+    def all_issns(self):
+        """normalized issn and issns, without duplicates"""
+        values = [self.issn] + list(self.issns or [])
+        return sorted({normalize_issn(v) for v in values if v} - {None})
+
     class Meta:
         verbose_name = "Journal"
         verbose_name_plural = "Journals"
         db_table = "journal"
         ordering = ["-paper_count"]
+
+
+class CurrencyRatesManager(models.Manager):
+    def latest_id(self):
+        return self.order_by("-id").values_list("id", flat=True).first()
+
+    def store(self, rate_table):
+        """save rate_table as the newest snapshot and drop the older ones"""
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            stored = self.create(
+                date=rate_table.date,
+                rates={c: list(pair) for c, pair in rate_table._rates.items()},
+            )
+            self.filter(id__lt=stored.id).delete()
+        return stored
+
+
+class CurrencyRates(models.Model):
+    """the ECB rates refresh_currency_rates downloaded, parsed. kept in the database
+    so web and worker dynos all convert with the same, current rates"""
+
+    id = models.BigAutoField(primary_key=True)
+    date = models.DateField()
+    # {currency: [rate, USD rate]} against EUR
+    rates = models.JSONField()
+    fetched = models.DateTimeField(auto_now_add=True)
+
+    objects = CurrencyRatesManager()
+
+    def __str__(self):
+        return f"ECB rates as of {self.date}"
+
+    class Meta:
+        verbose_name = "Currency rates"
+        verbose_name_plural = "Currency rates"
+        db_table = "currency_rates"
+
+
+class RorOrganization(models.Model):
+    """an organization from the ROR data dump, loaded by load_ror_dump so enrichment
+    doesn't have to ask the ROR API for it"""
+
+    ror_id = models.CharField(max_length=32, primary_key=True)
+    name = models.TextField(blank=True, null=True)
+    aliases = models.JSONField(default=list)
+    country_code = models.CharField(max_length=2, blank=True, null=True)
+
+    def __str__(self):
+        return self.name or self.ror_id
+
+    class Meta:
+        verbose_name = "ROR organization"
+        verbose_name_plural = "ROR organizations"
+        db_table = "ror_organization"
+
+
+class RorLookup(models.Model):
+    """wikidata id or normalized name -> ror id, see data.ror_index.RorIndex"""
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16)
+    key = models.TextField()
+    ror_id = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.kind} {self.key} -> {self.ror_id}"
+
+    class Meta:
+        verbose_name = "ROR lookup"
+        verbose_name_plural = "ROR lookups"
+        db_table = "ror_lookup"
+        indexes = [models.Index(fields=["kind", "key"])]
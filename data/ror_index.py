@@ -0,0 +1,214 @@
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+from django.db import router, transaction
+
+from data.utils import normalize_name
+
+ROR_URL_PREFIX = "https://ror.org/"
+# how long RorIndex trusts that the tables are (or aren't) loaded
+AVAILABLE_CHECK_INTERVAL = 300
+
+
+def iter_json_array(fp, chunk_size=1 << 20):
+    """yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    while True:
+        chunk = fp.read(chunk_size)
+        buffer += chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if not started:
+                if pos < len(buffer) and buffer[pos] == "[":
+                    started = True
+                    pos += 1
+                    continue
+                break
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item
+            pos = end
+        buffer = buffer[pos:]
+        if not chunk:
+            return
+
+
+def parse_organization(record):
+    """reduce a ROR dump record (schema v1 or v2) to the fields we use"""
+    ror_id = record["id"].replace(ROR_URL_PREFIX, "")
+    wikidata_ids = []
+    if "names" in record:
+        # schema v2
+        name = None
+        aliases = []
+        labels = []
+        for n in record.get("names", []):
+            types = n.get("types", [])
+            if "ror_display" in types:
+                name = n["value"]
+            elif "alias" in types:
+                aliases.append(n["value"])
+            elif "label" in types:
+                labels.append(n["value"])
+        country_code = None
+        for location in record.get("locations", []):
+            country_code = location.get("geonames_details", {}).get("country_code")
+            if country_code:
+                break
+        for external_id in record.get("external_ids", []):
+            if external_id.get("type") == "wikidata":
+                wikidata_ids.extend(external_id.get("all", []))
+    else:
+        name = record.get("name")
+        aliases = record.get("aliases", [])
+        labels = [label["label"] for label in record.get("labels", [])]
+        country_code = record.get("country", {}).get("country_code")
+        wikidata = record.get("external_ids", {}).get("Wikidata", {})
+        all_ids = wikidata.get("all", [])
+        wikidata_ids.extend([all_ids] if isinstance(all_ids, str) else all_ids)
+    return {
+        "ror_id": ror_id,
+        "name": name,
+        "aliases": aliases,
+        "labels": labels,
+        "country_code": country_code,
+        "wikidata_ids": wikidata_ids,
+    }
+
+
+def open_dump(path):
+    """open a ROR data dump, either the published zip or an extracted json file"""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        names = sorted(n for n in archive.namelist() if n.endswith(".json"))
+        if not names:
+            raise ValueError(f"no json file found in {path}")
+        # newer dumps ship both schemas, prefer v2
+        v2 = [n for n in names if "schema_v2" in n]
+        member = v2[0] if v2 else names[0]
+        return io.TextIOWrapper(archive.open(member), encoding="utf-8"), member
+    return open(path, encoding="utf-8"), os.path.basename(path)
+
+
+def build_index(records, batch_size=5000):
+    """replace the ror_organization and ror_lookup tables with records, in one
+    transaction so lookups see the old index until the new one is complete"""
+    from data.models import RorLookup, RorOrganization
+
+    organizations = {}
+    lookups = []
+    count = 0
+
+    def flush():
+        RorOrganization.objects.bulk_create(
+            organizations.values(),
+            update_conflicts=True,
+            unique_fields=["ror_id"],
+            update_fields=["name", "aliases", "country_code"],
+        )
+        RorLookup.objects.bulk_create(lookups)
+        organizations.clear()
+        lookups.clear()
+
+    with transaction.atomic(using=router.db_for_write(RorOrganization)):
+        RorLookup.objects.all().delete()
+        RorOrganization.objects.all().delete()
+        for record in records:
+            org = parse_organization(record)
+            organizations[org["ror_id"]] = RorOrganization(
+                ror_id=org["ror_id"],
+                name=org["name"],
+                aliases=org["aliases"],
+                country_code=org["country_code"],
+            )
+            for wikidata_id in org["wikidata_ids"]:
+                lookups.append(
+                    RorLookup(
+                        kind="wikidata", key=wikidata_id.upper(), ror_id=org["ror_id"]
+                    )
+                )
+            names = {org["name"] or "", *org["aliases"], *org["labels"]}
+            for name in names:
+                key = normalize_name(name)
+                if key:
+                    lookups.append(RorLookup(kind="name", key=key, ror_id=org["ror_id"]))
+            count += 1
+            if len(organizations) >= batch_size:
+                flush()
+        flush()
+    return count
+
+
+class RorIndex:
+    """lookups against the ROR tables filled by the load_ror_dump command. they live
+    in the database, so every web and worker dyno sees the same, current dump"""
+
+    def __init__(self):
+        self._available = None
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._available is None or now - self._checked > AVAILABLE_CHECK_INTERVAL:
+                from data.models import RorOrganization
+
+                self._available = RorOrganization.objects.exists()
+                self._checked = now
+            return self._available
+
+    def invalidate(self):
+        """make the next lookup check again whether the tables are loaded"""
+        with self._lock:
+            self._available = None
+
+    def get_organization(self, ror_id):
+        """return the organization in the same shape as the ROR API response"""
+        from data.models import RorOrganization
+
+        org = RorOrganization.objects.filter(
+            ror_id=ror_id.replace(ROR_URL_PREFIX, "")
+        ).first()
+        if org is None:
+            return None
+        return {
+            "id": f"{ROR_URL_PREFIX}{org.ror_id}",
+            "name": org.name,
+            "aliases": org.aliases,
+            "country": {"country_code": org.country_code},
+        }
+
+    def _find(self, kind, key):
+        from data.models import RorLookup
+
+        ror_ids = list(
+            RorLookup.objects.filter(kind=kind, key=key)
+            .values_list("ror_id", flat=True)
+            .distinct()[:2]
+        )
+        # ambiguous matches are treated as misses so the network search can decide
+        if len(ror_ids) == 1:
+            return f"{ROR_URL_PREFIX}{ror_ids[0]}"
+        return None
+
+    def find_by_wikidata_id(self, wikidata_id):
+        return self._find("wikidata", wikidata_id.upper())
+
+    def find_by_name(self, name):
+        return self._find("name", normalize_name(name))
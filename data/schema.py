@@ -0,0 +1,79 @@
+"""helpers for migrations that change the tables the openalex pipeline owns.
+
+concept, journal and publisher aren't created by our migrations (the router keeps
+model operations off them), so the columns we add are added here instead, in a way
+that copes with the column already existing, or on a blank local database with the
+table not existing yet."""
+
+from django.apps import apps
+from django.db import connections, router
+
+
+def table_columns(schema_editor, table):
+    """column names of table, or None if there is no such table"""
+    connection = schema_editor.connection
+    if table not in connection.introspection.table_names():
+        return None
+    with connection.cursor() as cursor:
+        description = connection.introspection.get_table_description(cursor, table)
+    return {column.name for column in description}
+
+
+def add_columns(model_name, *field_names):
+    """RunPython function adding the columns for field_names, if they are missing.
+    the fields have to be in the migration state already."""
+
+    def forwards(apps, schema_editor):
+        model = apps.get_model("data", model_name)
+        columns = table_columns(schema_editor, model._meta.db_table)
+        if columns is None:
+            return
+        for name in field_names:
+            field = model._meta.get_field(name)
+            if field.column not in columns:
+                schema_editor.add_field(model, field)
+
+    return forwards
+
+
+def remove_columns(model_name, *field_names):
+    def backwards(apps, schema_editor):
+        model = apps.get_model("data", model_name)
+        columns = table_columns(schema_editor, model._meta.db_table)
+        if columns is None:
+            return
+        for name in field_names:
+            field = model._meta.get_field(name)
+            if field.column in columns:
+                schema_editor.remove_field(model, field)
+
+    return backwards
+
+
+def run_on_postgresql(*statements):
+    """RunPython function executing statements on postgres only; sqlite has no
+    pg_trgm and no operator classes, and the app doesn't need the indexes there"""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+def create_external_tables(using):
+    """create the data tables our migrations don't (concept, journal, publisher) on a
+    blank local database, as the current models describe them. returns their names."""
+    connection = connections[using]
+    existing = set(connection.introspection.table_names())
+    created = []
+    with connection.schema_editor() as schema_editor:
+        for model in apps.get_app_config("data").get_models():
+            table = model._meta.db_table
+            if router.allow_migrate_model(using, model) or table in existing:
+                continue
+            schema_editor.create_model(model)
+            created.append(table)
+    return created
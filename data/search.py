@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import Counter
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Coalesce, Upper
+
+from data.enrichment import normalize_wikidata_id
+from data.utils import normalize_name
+
+SEARCH_RANK = "search_rank"
+# roughly postgres' default pg_trgm.word_similarity_threshold
+SIMILARITY_THRESHOLD = 0.6
+# similarities are at most 1, so an exact publisher_id match always comes first
+ID_MATCH_RANK = 2.0
+MAX_RESULTS = 500
+AUTOCOMPLETE_PAGE_SIZE = 20
+
+
+def trigrams(text):
+    """pg_trgm style trigrams: each word padded with two spaces in front and one after"""
+    result = set()
+    for word in text.split():
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class PublisherSearchIndex:
+    """in-process trigram index over publisher search documents, used when the
+    database can't do trigram matching itself (sqlite in development)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.postings = {}
+        for publisher_id, document in documents.items():
+            for trigram in trigrams(document):
+                self.postings.setdefault(trigram, []).append(publisher_id)
+
+    @classmethod
+    def from_queryset(cls, qs):
+        documents = {}
+        for publisher in qs.only("publisher_id", "display_name", "alternate_titles"):
+            documents[publisher.publisher_id] = publisher.build_search_document()
+        return cls(documents)
+
+    def search(self, term, limit=MAX_RESULTS):
+        """return [(publisher_id, score)], best matches first"""
+        term_trigrams = trigrams(term)
+        if not term_trigrams:
+            return []
+        shared = Counter()
+        for trigram in term_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+        results = []
+        for publisher_id, count in shared.items():
+            score = count / len(term_trigrams)
+            if score >= SIMILARITY_THRESHOLD or term in self.documents[publisher_id]:
+                results.append((publisher_id, score))
+        results.sort(key=lambda r: (-r[1], r[0]))
+        return results[:limit]
+
+
+_index = None
+_index_built = 0
+_index_lock = threading.Lock()
+INDEX_TTL = 60
+
+
+def get_publisher_search_index(qs):
+    global _index, _index_built
+    with _index_lock:
+        if _index is None or time.monotonic() - _index_built > INDEX_TTL:
+            _index = PublisherSearchIndex.from_queryset(qs.model.objects.using(qs.db))
+            _index_built = time.monotonic()
+        return _index
+
+
+def invalidate_publisher_search_index():
+    global _index
+    _index = None
+
+
+def search_publishers(qs, search_term):
+    """filter qs to publishers matching search_term, annotated with search_rank.
+
+    a number matches that publisher_id as well as names containing it ("3M", "1776
+    Press"), with the id match ranked first. a term that is only punctuation
+    matches nothing."""
+    search_term = search_term.strip()
+    qid = normalize_wikidata_id(search_term)
+    if qid:
+        return qs.filter(
+            Q(wikidata_id__iexact=qid) | Q(wikidata_id__iendswith=f"/{qid}")
+        ).annotate(**{SEARCH_RANK: Value(1.0, output_field=FloatField())})
+
+    publisher_id = int(search_term) if search_term.isdigit() else None
+    term = normalize_name(search_term)
+    if not term and publisher_id is None:
+        return qs.none()
+    if connections[qs.db].vendor == "postgresql":
+        # served by the gin_trgm_ops indexes on publisher.search_document and
+        # upper(display_name), see data/migrations/0005_publisher_search_document.py.
+        # rows the pipeline inserted have no search_document until the next
+        # rebuild_publisher_search, the display_name match still finds them
+        matches = (
+            Q(search_document__contains=term)
+            | Q(search_document__trigram_word_similar=term)
+            | Q(display_name__icontains=search_term)
+        )
+        rank = Coalesce(
+            TrigramWordSimilarity(term, "search_document"),
+            TrigramWordSimilarity(search_term, "display_name"),
+        )
+        if publisher_id is not None:
+            matches |= Q(publisher_id=publisher_id)
+            rank = Case(
+                When(publisher_id=publisher_id, then=Value(ID_MATCH_RANK)),
+                default=rank,
+                output_field=FloatField(),
+            )
+        return qs.filter(matches).annotate(**{SEARCH_RANK: rank})
+
+    matches = get_publisher_search_index(qs).search(term)
+    if publisher_id is not None:
+        matches = [(publisher_id, ID_MATCH_RANK)] + [
+            m for m in matches if m[0] != publisher_id
+        ]
+    if not matches:
+        return qs.none()
+    return qs.filter(publisher_id__in=[m[0] for m in matches]).annotate(
+        **{
+            SEARCH_RANK: Case(
+                *[When(publisher_id=pk, then=Value(score)) for pk, score in matches],
+                output_field=FloatField(),
+            )
+        }
+    )
+
+
+def publisher_autocomplete_page(qs, term, page=1, page_size=AUTOCOMPLETE_PAGE_SIZE):
+    """one page of (publisher_id, display_name) whose name starts with term, or
+    whose id is term. returns (rows, more)."""
+    term = term.strip()
+    if term.isdigit():
+        qs = qs.filter(publisher_id=int(term))
+    else:
+        # on postgres this is served by the prefix index from data migration 0008
+        qs = qs.annotate(name_upper=Upper("display_name")).filter(
+            name_upper__startswith=term.upper()
+        )
+    start = (page - 1) * page_size
+    rows = list(
+        qs.order_by(Upper("display_name"), "publisher_id").values_list(
+            "publisher_id", "display_name"
+        )[start : start + page_size + 1]
+    )
+    return rows[:page_size], len(rows) > page_size
@@ -0,0 +1,11 @@
+from data.models import Publisher
+
+
+def enrich_publisher(publisher_id):
+    """background job queued by PublisherAdmin.save_model. raises EnrichmentError
+    while ROR or Wikidata are unreachable, so run_jobs retries it later"""
+    publisher = Publisher.objects.filter(publisher_id=publisher_id).first()
+    if publisher is None:
+        return
+    publisher.enrich()
+    publisher.save(enrich=False, update_fields=Publisher.ENRICHED_FIELDS)
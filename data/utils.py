@@ -0,0 +1,10 @@
+import re
+import unicodedata
+
+
+def normalize_name(name):
+    """casefold, strip accents and punctuation so that lookups match loosely"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = re.sub(r"[^\w\s]", " ", name.casefold())
+    return " ".join(name.split())
@@ -0,0 +1,50 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "task",
+        "key",
+        "status",
+        "attempts",
+        "run_after",
+        "created",
+        "updated",
+    )
+    list_filter = ("status", "task")
+    search_fields = ("task", "key")
+    readonly_fields = (
+        "id",
+        "task",
+        "key",
+        "payload",
+        "attempts",
+        "last_error",
+        "claimed",
+        "result",
+        "created",
+        "updated",
+    )
+
+    actions = ["retry_jobs"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        # running jobs are left alone unless their worker has gone away
+        running = queryset.filter(status=Job.RUNNING).exclude(
+            id__in=Job.objects.expired().values("id")
+        )
+        count = queryset.exclude(id__in=running.values("id")).update(
+            status=Job.PENDING, attempts=0, run_after=timezone.now()
+        )
+        self.message_user(request, f"{count} jobs queued for retry.")
+
+
+admin.site.register(Job, JobAdmin)
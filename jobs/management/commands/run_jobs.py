@@ -0,0 +1,94 @@
+import datetime
+import time
+import traceback
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="drain the queue once and exit instead of polling",
+        )
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument(
+            "--sleep", type=float, default=5, help="seconds to wait when idle"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = self.claim(options["batch_size"])
+            for job in jobs:
+                self.run(job)
+            if not jobs:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+
+    def claim(self, batch_size):
+        """mark a batch of due jobs as running, skipping rows another worker has locked.
+
+        jobs left running by a worker that died are claimed again once their lease
+        expires. the attempt is counted here, so a job that keeps killing its worker
+        still ends up failed."""
+        db = router.db_for_write(Job)
+        now = timezone.now()
+        with transaction.atomic(using=db):
+            manager = Job.objects.db_manager(db)
+            manager.expired().filter(attempts__gte=F("max_attempts")).update(
+                status=Job.FAILED,
+                last_error="the worker running this job stopped",
+                updated=now,
+            )
+            qs = (manager.due() | manager.expired()).order_by("run_after", "id")
+            if connections[db].features.has_select_for_update_skip_locked:
+                qs = qs.select_for_update(skip_locked=True)
+            jobs = list(qs[:batch_size])
+            Job.objects.using(db).filter(id__in=[j.id for j in jobs]).update(
+                status=Job.RUNNING,
+                attempts=F("attempts") + 1,
+                claimed=now,
+                updated=now,
+            )
+        for job in jobs:
+            job.attempts += 1
+        return jobs
+
+    def run(self, job):
+        try:
+            handler = import_string(job.task)
+            result = handler(**job.payload)
+        except Exception:
+            job.last_error = traceback.format_exc()
+            if job.attempts >= job.max_attempts:
+                job.status = Job.FAILED
+            else:
+                job.status = Job.PENDING
+                job.run_after = timezone.now() + datetime.timedelta(
+                    seconds=job.retry_delay()
+                )
+            self.stderr.write(f"job {job.id} ({job.task}) failed: {job.last_error}")
+        else:
+            job.status = Job.DONE
+            job.last_error = None
+            job.result = result
+        job.save(
+            update_fields=[
+                "attempts",
+                "status",
+                "run_after",
+                "last_error",
+                "result",
+                "updated",
+            ]
+        )
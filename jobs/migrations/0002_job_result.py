@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,112 @@
+import datetime
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class JobManager(models.Manager):
+    def enqueue(self, task, payload=None, key=None, delay=0, max_attempts=5):
+        """queue task (a dotted path to a function) to be run by the run_jobs worker.
+
+        if key is given and a pending job with the same key exists, that job is
+        returned instead of creating a new one, so repeated saves coalesce."""
+        run_after = timezone.now() + datetime.timedelta(seconds=delay)
+        if key:
+            existing = self.filter(key=key, status=Job.PENDING).first()
+            if existing:
+                return existing
+        return self.create(
+            task=task,
+            payload=payload or {},
+            key=key,
+            run_after=run_after,
+            max_attempts=max_attempts,
+        )
+
+    def enqueue_many(self, task, jobs, max_attempts=5):
+        """enqueue(task, payload, key) for each (key, payload) in jobs, skipping keys
+        that already have a pending job, in one lookup and one insert per 500 keys.
+        returns the number of jobs created"""
+        jobs = dict(jobs)
+        keys = list(jobs)
+        created = 0
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            pending = set(
+                self.filter(key__in=batch, status=Job.PENDING).values_list(
+                    "key", flat=True
+                )
+            )
+            new = self.bulk_create(
+                [
+                    Job(
+                        task=task,
+                        payload=jobs[key] or {},
+                        key=key,
+                        max_attempts=max_attempts,
+                    )
+                    for key in batch
+                    if key not in pending
+                ]
+            )
+            created += len(new)
+        return created
+
+    def due(self):
+        return self.filter(status=Job.PENDING, run_after__lte=timezone.now())
+
+    def expired(self):
+        """running jobs whose worker has held them longer than JOB_LEASE_SECONDS,
+        most likely because it crashed or was killed"""
+        cutoff = timezone.now() - datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        return self.filter(status=Job.RUNNING, claimed__lt=cutoff)
+
+    def latest_for_key(self, key):
+        return self.filter(key=key).order_by("-created").first()
+
+
+class Job(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    # when a worker last took the job, see JobManager.expired()
+    claimed = models.DateTimeField(blank=True, null=True)
+    # whatever the task returned, if it is json serializable
+    result = models.JSONField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = JobManager()
+
+    class Meta:
+        db_table = "dashboard_job"
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ["-created"]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
+
+    def retry_delay(self):
+        # 30s, 60s, 120s, ... capped at an hour
+        return min(30 * 2 ** (self.attempts - 1), 3600)
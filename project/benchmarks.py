@@ -0,0 +1,428 @@
+"""benchmarks for the expensive admin paths, run by `manage.py run_benchmarks`.
+
+they run against sqlite (project.settings_benchmark) with FakeUpstreamAdapter mounted
+on the outbound session, which answers like ROR, Wikidata, Zendesk and Heroku after a
+configurable delay. each operation reports its latency, outbound calls and queries.
+
+in-process caches are emptied before every iteration, so query and call counts are
+the same from run to run; those are what --fail-on-regression gates on. latency is
+reported as the best median of several runs, and only gates with --fail-on-latency."""
+
+import json
+import os
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router
+from requests.adapters import BaseAdapter
+
+ZENDESK_BASE_URL = "https://zendesk.benchmark.invalid/api/v2"
+
+
+class FakeUpstreamAdapter(BaseAdapter):
+    """requests transport that answers like the services we call, without a network.
+
+    Zendesk users and Heroku config vars are kept in memory so that searches find
+    users created earlier and config var diffs behave like the real thing."""
+
+    def __init__(self, latency=0.02):
+        super().__init__()
+        self.latency = latency
+        self.calls = Counter()
+        self.zendesk_users = {}
+        self.config_vars = {}
+
+    def send(self, request, **kwargs):
+        time.sleep(self.latency)
+        parts = urlsplit(request.url)
+        self.calls[parts.hostname] += 1
+        body = json.loads(request.body) if request.body else None
+        status, data = self.route(request.method, parts, parse_qs(parts.query), body)
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(data).encode()
+        response.headers["Content-Type"] = "application/json"
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+    def route(self, method, parts, query, body):
+        host, path = parts.hostname, parts.path
+        if host == "api.ror.org":
+            return self.ror(path, query)
+        if host == "www.wikidata.org":
+            return self.wikidata(query)
+        if host == "api.heroku.com":
+            return self.heroku(method, body)
+        if host == urlsplit(ZENDESK_BASE_URL).hostname:
+            return self.zendesk(method, path.replace("/api/v2", "", 1), query, body)
+        return 404, {}
+
+    def ror(self, path, query):
+        match = re.match(r"^/organizations/(\w+)$", path)
+        if match:
+            ror_id = match.group(1)
+        else:
+            ror_id = f"0{zlib.crc32(str(query).encode()) % 10**8:08d}"
+        organization = {
+            "id": f"https://ror.org/{ror_id}",
+            "name": f"Organization {ror_id}",
+            "aliases": [f"Org {ror_id}"],
+            "country": {"country_code": "GB"},
+        }
+        if match:
+            return 200, organization
+        return 200, {"number_of_results": 1, "items": [organization]}
+
+    def wikidata(self, query):
+        ids = query.get("ids", [""])[0].split("|")
+        return 200, {
+            "entities": {
+                qid: {"aliases": {"en": [{"value": f"{qid} alias"}]}} for qid in ids
+            }
+        }
+
+    def heroku(self, method, body):
+        if method == "PATCH":
+            for name, value in body.items():
+                if value is None:
+                    self.config_vars.pop(name, None)
+                else:
+                    self.config_vars[name] = value
+        return 200, self.config_vars
+
+    def zendesk_user(self, email, name=None):
+        user = self.zendesk_users.get(email)
+        if user is None:
+            user = {
+                "id": len(self.zendesk_users) + 1,
+                "email": email,
+                "name": name or email,
+                "organization_id": None,
+                "tags": [],
+            }
+            self.zendesk_users[email] = user
+        return user
+
+    def finished_job(self, results):
+        # real bulk jobs are queued and polled; this one is already done
+        for result in results:
+            if "error" not in result:
+                result["status"] = "Updated"
+        return {"job_status": {"id": "job", "status": "completed", "results": results}}
+
+    def zendesk(self, method, path, query, body):
+        if path == "/users/search.json":
+            email = query["query"][0].replace("email:", "")
+            users = [self.zendesk_users[email]] if email in self.zendesk_users else []
+            return 200, {"count": len(users), "users": users}
+        if path == "/users.json" and method == "POST":
+            return 201, {"user": self.zendesk_user(body["user"]["email"])}
+        if path == "/users/create_or_update_many.json":
+            results = []
+            for index, u in enumerate(body["users"]):
+                if u["email"] not in self.zendesk_users and not u.get("name"):
+                    # like zendesk, a new user needs a name
+                    results.append(
+                        {
+                            "index": index,
+                            "email": u["email"],
+                            "error": "UserCreateFailed",
+                            "details": "Name: is too short (minimum one character)",
+                        }
+                    )
+                    continue
+                user = self.zendesk_user(u["email"], u.get("name"))
+                user["name"] = u.get("name") or user["name"]
+                results.append({"index": index, "id": user["id"], "email": u["email"]})
+            return 200, self.finished_job(results)
+        if path == "/users/show_many.json":
+            ids = {int(i) for i in query["ids"][0].split(",")}
+            users = [u for u in self.zendesk_users.values() if u["id"] in ids]
+            return 200, {"users": users}
+        if path == "/users/update_many.json":
+            return 200, self.finished_job([{"id": u["id"]} for u in body["users"]])
+        if re.match(r"^/users/\d+(/tags)?\.json$", path):
+            return 200, {}
+        return 404, {}
+
+
+def create_tables():
+    """create every model's table on the database the routers send it to.
+
+    most tables (journal, publisher, api_key, ...) belong to the pipeline and the API
+    proxy and have no migrations, so every table, ours included, is created straight
+    from the models."""
+    for alias in connections:
+        connections[alias].close()
+        name = settings.DATABASES[alias]["NAME"]
+        if os.path.exists(name):
+            os.remove(name)
+    for model in apps.get_models():
+        db = router.db_for_write(model) or "default"
+        with connections[db].schema_editor() as schema_editor:
+            schema_editor.create_model(model)
+
+
+def seed(rows, rng):
+    from django.contrib.auth.models import User
+
+    from data.models import Concept, Journal, Publisher
+    from sales.models import APIKey, RatelimitExempt
+
+    Publisher.objects.bulk_create(
+        Publisher(
+            publisher_id=i,
+            display_name=f"Publisher {i}",
+            wikidata_id=f"https://www.wikidata.org/wiki/Q{1000 + i}",
+            hierarchy_level=0,
+        )
+        for i in range(1, rows + 1)
+    )
+    Journal.objects.bulk_create(
+        Journal(
+            journal_id=i,
+            display_name=f"Journal {i}",
+            publisher_id=rng.randint(1, rows),
+            issn=f"{i // 10000:04d}-{i % 10000:04d}",
+            paper_count=int(rng.paretovariate(1.2) * 10),
+        )
+        for i in range(1, rows + 1)
+    )
+    Concept.objects.bulk_create(
+        Concept(
+            field_of_study_id=i,
+            display_name=f"Concept {i}",
+            level=i % 5,
+            wikipedia_json={"extract": "lorem ipsum " * 2000},
+        )
+        for i in range(1, rows // 10 + 2)
+    )
+    APIKey.objects.bulk_create(
+        APIKey(email=f"user{i}@example.org", name=f"User {i}", key=f"key{i}")
+        for i in range(1, 51)
+    )
+    RatelimitExempt.objects.bulk_create(
+        RatelimitExempt(email=f"exempt{i}@example.org") for i in range(1, 51)
+    )
+    return User.objects.create_superuser("benchmark", "benchmark@example.org", "x")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.counts = Counter()
+
+    def wrapper(self, alias):
+        def count(execute, sql, params, many, context):
+            self.counts[alias] += 1
+            return execute(sql, params, many, context)
+
+        return count
+
+
+def reset_caches():
+    """empty the in-process caches, so every iteration makes the same queries and calls
+    instead of the first one warming them for the rest"""
+    from data.currency import invalidate_rate_table
+    from data.enrichment import get_enrichment_client
+    from data.models import invalidate_top_level_parents
+    from data.search import invalidate_publisher_search_index
+
+    client = get_enrichment_client()
+    client.cache.clear()
+    client.ror_index.invalidate()
+    invalidate_rate_table()
+    invalidate_publisher_search_index()
+    invalidate_top_level_parents()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[int(p * (len(ordered) - 1))]
+
+
+class BenchmarkRunner:
+    def __init__(self, latency=0.02, iterations=20, runs=3, rows=500, seed=0):
+        self.latency = latency
+        self.iterations = iterations
+        self.runs = runs
+        self.rows = rows
+        self.rng = random.Random(seed)
+
+    def setup(self):
+        from django.test import Client
+
+        from project.http import get_session
+
+        create_tables()
+        self.user = seed(self.rows, self.rng)
+        self.adapter = FakeUpstreamAdapter(self.latency)
+        session = get_session()
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        os.environ["ZENDESK_API_BASE_URL"] = ZENDESK_BASE_URL
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def operations(self):
+        """name -> function(iteration); iterations are numbered across runs, so every
+        one has a change to save"""
+        from django.contrib import admin
+        from django.contrib.messages.storage.cookie import CookieStorage
+        from django.test import RequestFactory
+
+        from data.models import Journal, Publisher
+        from sales.models import APIKey, RatelimitExempt
+        from sales.tasks import sync_unlimited_emails, zendesk_sync_api_keys
+
+        def publisher_save(i):
+            publisher = Publisher.objects.get(pk=i % self.rows + 1)
+            publisher.display_name = f"Publisher {publisher.pk} renamed {i}"
+            publisher.save()
+
+        def journal_save(i):
+            journal = Journal.objects.get(pk=i % self.rows + 1)
+            journal.apc_prices = [{"price": 1000 + i, "currency": "EUR"}]
+            journal.apc_usd = None
+            journal.save()
+
+        def apikey_save_model(i):
+            request = RequestFactory().post("/admin/sales/apikey/")
+            request.user = self.user
+            request._messages = CookieStorage(request)
+            # seed() creates 50 keys
+            key = APIKey.objects.get(email=f"user{i % 50 + 1}@example.org")
+            admin.site._registry[APIKey].save_model(request, key, None, True)
+
+        def ratelimit_sync(i):
+            # flip one email so every run has a change to publish
+            RatelimitExempt.objects.filter(pk=1).update(active=i % 2 == 0)
+            sync_unlimited_emails()
+
+        def zendesk_bulk_sync(i):
+            zendesk_sync_api_keys(list(APIKey.objects.values_list("id", flat=True)))
+
+        def changelist(url):
+            def get(i):
+                response = self.client.get(url)
+                assert response.status_code == 200, (url, response.status_code)
+
+            return get
+
+        return {
+            "publisher_save": publisher_save,
+            "journal_save": journal_save,
+            "apikey_save_model": apikey_save_model,
+            "ratelimit_sync": ratelimit_sync,
+            "zendesk_bulk_sync": zendesk_bulk_sync,
+            "journal_changelist": changelist("/admin/data/journal/"),
+            "journal_issn_search": changelist("/admin/data/journal/?q=0000-0012"),
+            "publisher_changelist": changelist("/admin/data/publisher/"),
+            "publisher_search": changelist("/admin/data/publisher/?q=publisher+12"),
+            "concept_changelist": changelist("/admin/data/concept/"),
+            "apikey_changelist": changelist("/admin/sales/apikey/"),
+        }
+
+    def run(self, only=None):
+        self.setup()
+        operations = {
+            name: operation
+            for name, operation in self.operations().items()
+            if not only or name in only
+        }
+        measurements = {name: [] for name in operations}
+        # whole rounds over every operation, so a slow patch on the machine hits one
+        # round of each rather than every round of one
+        for run in range(self.runs):
+            for name, operation in operations.items():
+                measurements[name].append(
+                    self.measure(operation, start=run * self.iterations)
+                )
+        return {
+            "meta": {
+                "latency_ms": self.latency * 1000,
+                "iterations": self.iterations,
+                "runs": self.runs,
+                "rows": self.rows,
+            },
+            "results": {
+                name: self.summarize(runs) for name, runs in measurements.items()
+            },
+        }
+
+    def measure(self, operation, start=0):
+        timings = []
+        counter = QueryCounter()
+        calls_before = sum(self.adapter.calls.values())
+        for i in range(self.iterations):
+            reset_caches()
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(counter.wrapper(alias))
+                    )
+                started = time.perf_counter()
+                operation(start + i)
+                timings.append(time.perf_counter() - started)
+        calls = sum(self.adapter.calls.values()) - calls_before
+        return {
+            "p50_ms": round(percentile(timings, 0.5) * 1000, 2),
+            "max_ms": round(max(timings) * 1000, 2),
+            "calls": round(calls / self.iterations, 2),
+            "queries": round(sum(counter.counts.values()) / self.iterations, 2),
+            "queries_by_alias": {
+                alias: round(count / self.iterations, 2)
+                for alias, count in sorted(counter.counts.items())
+            },
+        }
+
+    def summarize(self, runs):
+        """counts from the first run, the one that starts from the seeded data (later
+        runs find e.g. the zendesk users the first one created); the fastest median"""
+        return {
+            **runs[0],
+            "p50_ms": min(r["p50_ms"] for r in runs),
+            "max_ms": max(r["max_ms"] for r in runs),
+        }
+
+
+def compare(baseline, current, threshold=0.5, min_ms=5, gate_latency=False):
+    """[(operation, message, is_regression)] comparing two benchmark results.
+
+    query and call counts don't change between runs, so any increase is a regression.
+    the best p50 still varies by tens of percent on a busy machine, so it only counts
+    with gate_latency, and then only when it is more than threshold (and min_ms)
+    slower."""
+    lines = []
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            lines.append((name, "new", False))
+            continue
+        regressions = []
+        changes = []
+        for key in ("queries", "calls"):
+            if result[key] != old[key]:
+                changes.append(f"{key} {old[key]} -> {result[key]}")
+                if result[key] > old[key]:
+                    regressions.append(key)
+        delta = result["p50_ms"] - old["p50_ms"]
+        if old["p50_ms"]:
+            change = delta / old["p50_ms"]
+            changes.append(f"p50 {old['p50_ms']} -> {result['p50_ms']} ms ({change:+.0%})")
+        if gate_latency and delta > max(min_ms, threshold * old["p50_ms"]):
+            regressions.append("p50")
+        lines.append((name, ", ".join(changes) or "unchanged", bool(regressions)))
+    return lines
@@ -0,0 +1,248 @@
+import email.utils
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+import sentry_sdk
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from project.metrics import record_upstream_call
+
+# 429 and 5xx are retried; anything else is handed straight back to the caller
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# connection errors and 5xx are only retried for these, since a failed POST may still
+# have been applied upstream; callers pass idempotent=True for a POST or PATCH that is
+# safe to repeat. 429 is retried for every method.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class LatencyStats:
+    """collects upstream request durations per host, keeping the last max_samples"""
+
+    def __init__(self, max_samples=None):
+        self.samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._lock = threading.Lock()
+
+    def record(self, host, seconds):
+        with self._lock:
+            self.samples[host].append(seconds)
+
+    def summary(self):
+        """{host: (count, p50, p95)} with latencies in seconds"""
+        result = {}
+        with self._lock:
+            for host, samples in self.samples.items():
+                ordered = sorted(samples)
+                result[host] = (
+                    len(ordered),
+                    ordered[int(0.5 * (len(ordered) - 1))],
+                    ordered[int(0.95 * (len(ordered) - 1))],
+                )
+        return result
+
+
+class CircuitOpenError(requests.RequestException):
+    """raised instead of calling a host whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """stops calling a host after failure_threshold failures in a row.
+
+    after reset_timeout seconds one trial request is let through (half open); it
+    closes the breaker on success and opens it again on failure."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def retry_after_seconds(response):
+    """the Retry-After header as seconds, or None if missing or unparseable"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return int(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0, date.timestamp() - time.time())
+
+
+class OutboundSession(requests.Session):
+    """requests session for every call we make to other services.
+
+    adds per-host (connect, read) timeouts, a few retries with jittered exponential
+    backoff on connection errors, 429 and 5xx (honouring Retry-After), and a circuit
+    breaker per host so a dead upstream fails fast instead of tying up workers."""
+
+    def __init__(
+        self,
+        timeouts=None,
+        max_retries=2,
+        backoff_base=0.5,
+        max_backoff=10,
+        failure_threshold=5,
+        reset_timeout=30,
+        pool_size=10,
+    ):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.timeouts = timeouts or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+        self.latency = LatencyStats(max_samples=1000)
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, host):
+        with self._breakers_lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.breakers[host] = breaker
+            return breaker
+
+    def timeout_for(self, host):
+        return self.timeouts.get(host) or self.timeouts.get("default")
+
+    def backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self.max_backoff, self.backoff_base * 2**attempt))
+
+    def request(self, method, url, *args, idempotent=None, **kwargs):
+        parts = urlsplit(url)
+        host = parts.hostname
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit breaker for {host} is open")
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout_for(host)
+        retry_errors = idempotent
+        if retry_errors is None:
+            retry_errors = method.upper() in IDEMPOTENT_METHODS
+
+        # no query string in the description, zendesk searches put emails there
+        description = f"{method} {host}{parts.path}"
+        with sentry_sdk.start_span(op="http.upstream", description=description):
+            return self._request(
+                breaker, host, retry_errors, method, url, *args, **kwargs
+            )
+
+    def _request(self, breaker, host, retry_errors, method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(host, time.monotonic() - start)
+                if not retry_errors or attempt >= self.max_retries:
+                    breaker.record_failure()
+                    raise
+                wait = self.backoff(attempt)
+            except requests.RequestException:
+                breaker.record_failure()
+                raise
+            else:
+                self._record(host, time.monotonic() - start)
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                retryable = response.status_code == 429 or retry_errors
+                wait = self.backoff(attempt, response)
+                give_up = attempt >= self.max_retries or wait > self.max_backoff
+                if not retryable or give_up:
+                    breaker.record_failure()
+                    return response
+                # hand the connection back to the pool before waiting
+                response.close()
+            time.sleep(wait)
+            attempt += 1
+
+    def _record(self, host, seconds):
+        self.latency.record(host, seconds)
+        record_upstream_call(host, seconds)
+
+    def status(self):
+        """{host: {"state", "failures", "count", "p50", "p95"}} for monitoring"""
+        latency = self.latency.summary()
+        hosts = set(self.breakers) | set(latency)
+        result = {}
+        for host in sorted(hosts, key=str):
+            breaker = self.breakers.get(host)
+            count, p50, p95 = latency.get(host, (0, None, None))
+            result[host] = {
+                "state": breaker.state if breaker else CircuitBreaker.CLOSED,
+                "failures": breaker.failures if breaker else 0,
+                "count": count,
+                "p50": p50,
+                "p95": p95,
+            }
+        return result
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """process-wide outbound session, so breakers and connection pools are shared"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = OutboundSession(timeouts=settings.OUTBOUND_HTTP_TIMEOUTS)
+    return _session
@@ -0,0 +1,149 @@
+import threading
+from contextvars import ContextVar
+
+# seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """prometheus style histogram, one series per combination of label values"""
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per bucket counts, then sum and count
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _labels(self.labels, label_values, [("le", _number(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _labels(self.labels, label_values, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_number(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+request_seconds = Histogram(
+    "dashboard_request_seconds", "Wall time per request", ["view"]
+)
+request_db_queries = Histogram(
+    "dashboard_request_db_queries",
+    "Queries per request, by database alias",
+    ["view", "alias"],
+    COUNT_BUCKETS,
+)
+request_db_seconds = Histogram(
+    "dashboard_request_db_seconds",
+    "Time spent in queries per request, by database alias",
+    ["view", "alias"],
+)
+request_upstream_calls = Histogram(
+    "dashboard_request_upstream_calls",
+    "Outbound HTTP calls per request, by host",
+    ["view", "host"],
+    COUNT_BUCKETS,
+)
+request_upstream_seconds = Histogram(
+    "dashboard_request_upstream_seconds",
+    "Time spent in outbound HTTP calls per request, by host",
+    ["view", "host"],
+)
+upstream_call_seconds = Histogram(
+    "dashboard_upstream_call_seconds",
+    "Latency of each outbound HTTP call, including ones made by jobs and commands",
+    ["host"],
+)
+HISTOGRAMS = [
+    request_seconds,
+    request_db_queries,
+    request_db_seconds,
+    request_upstream_calls,
+    request_upstream_seconds,
+    upstream_call_seconds,
+]
+
+
+class RequestMetrics:
+    """what one request spent, filled in by the query wrapper and record_upstream_call"""
+
+    def __init__(self):
+        # alias or host -> [count, seconds]
+        self.queries = {}
+        self.upstream = {}
+
+    def add_query(self, alias, seconds):
+        totals = self.queries.setdefault(alias, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+    def add_upstream_call(self, host, seconds):
+        totals = self.upstream.setdefault(host, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+
+current_request = ContextVar("current_request_metrics", default=None)
+
+
+def record_upstream_call(host, seconds):
+    """called by OutboundSession for every request it makes"""
+    upstream_call_seconds.observe(seconds, host)
+    metrics = current_request.get()
+    if metrics is not None:
+        metrics.add_upstream_call(host, seconds)
+
+
+def record_request(view, seconds, metrics, aliases):
+    request_seconds.observe(seconds, view)
+    for alias in aliases:
+        count, total = metrics.queries.get(alias, (0, 0.0))
+        request_db_queries.observe(count, view, alias)
+        request_db_seconds.observe(total, view, alias)
+    for host, (count, total) in metrics.upstream.items():
+        request_upstream_calls.observe(count, view, host)
+        request_upstream_seconds.observe(total, view, host)
+
+
+def render(extra_lines=()):
+    """all metrics in the prometheus text format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,67 @@
+import time
+from contextlib import ExitStack
+
+import sentry_sdk
+from django.conf import settings
+from django.db import connections
+
+from project import metrics
+
+
+class RequestMetricsMiddleware:
+    """times each request and counts its queries per database alias and its outbound
+    calls per host, for the /metrics endpoint and sentry performance data"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+        start = time.monotonic()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(
+                            QueryTimer(alias, request_metrics)
+                        )
+                    )
+                return self.get_response(request)
+        finally:
+            elapsed = time.monotonic() - start
+            metrics.current_request.reset(token)
+            match = getattr(request, "resolver_match", None)
+            if match is not None and match.view_name != "metrics":
+                metrics.record_request(
+                    match.view_name, elapsed, request_metrics, list(connections)
+                )
+                if settings.SENTRY_TRACES_SAMPLE_RATE:
+                    add_sentry_measurements(request_metrics)
+
+
+class QueryTimer:
+    def __init__(self, alias, request_metrics):
+        self.alias = alias
+        self.request_metrics = request_metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.request_metrics.add_query(self.alias, time.monotonic() - start)
+
+
+def add_sentry_measurements(request_metrics):
+    transaction = sentry_sdk.Hub.current.scope.transaction
+    if transaction is None:
+        return
+    for alias, (count, seconds) in request_metrics.queries.items():
+        transaction.set_measurement(f"db.{alias}.queries", count)
+        transaction.set_measurement(f"db.{alias}.time", seconds * 1000, "millisecond")
+    for host, (count, seconds) in request_metrics.upstream.items():
+        transaction.set_measurement(f"upstream.{host}.calls", count)
+        transaction.set_measurement(
+            f"upstream.{host}.time", seconds * 1000, "millisecond"
+        )
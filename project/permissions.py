@@ -0,0 +1,16 @@
+def group_names(user):
+    """names of the user's groups, queried once and kept on the user object.
+
+    request.user is loaded fresh for every request, so this is a per-request cache and
+    the admin's many permission checks per page share a single query."""
+    names = getattr(user, "_group_names", None)
+    if names is None:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        user._group_names = names
+    return names
+
+
+def in_group_or_superuser(user, group_name):
+    if user.is_superuser:
+        return True
+    return group_name in group_names(user)
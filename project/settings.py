@@ -14,11 +14,16 @@ DEBUG = os.getenv("DEBUG", False)
 
 ALLOWED_HOSTS = ["*"]
 
+# above 0, a share of requests is traced and RequestMetricsMiddleware adds per database
+# and per upstream host measurements to the trace
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", 0))
+
 sentry_sdk.init(
     dsn=os.environ.get("SENTRY_DSN"),
     integrations=[
         DjangoIntegration(),
     ],
+    traces_sample_rate=SENTRY_TRACES_SAMPLE_RATE,
 )
 
 # Application definition
@@ -31,11 +36,14 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "data",
     "sales",
+    "jobs",
 ]
 
 MIDDLEWARE = [
+    "project.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -125,6 +133,29 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# seconds a worker may hold a running job; after that run_jobs assumes the worker died
+# and runs the job again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 3600))
+
+# how rate-limit exempt emails are published to the API proxy: "plain" (semicolon
+# separated addresses) or "sha256" (sorted email hashes, see sales/unlimited_emails.py)
+UNLIMITED_EMAILS_FORMAT = os.getenv("UNLIMITED_EMAILS_FORMAT", "plain")
+
+# seconds to trust a cached email -> zendesk user id before searching zendesk again
+ZENDESK_USER_CACHE_TTL = int(os.getenv("ZENDESK_USER_CACHE_TTL", 7 * 24 * 3600))
+
+# (connect, read) timeouts in seconds for outbound calls, by host; see project/http.py
+OUTBOUND_HTTP_TIMEOUTS = {
+    "default": (3.05, 10),
+    "www.wikidata.org": (3.05, 20),
+    "api.heroku.com": (3.05, 20),
+    # the full rate history zip is a few megabytes
+    "www.ecb.europa.eu": (3.05, 60),
+}
+
+# bearer token prometheus uses to scrape /metrics; staff users can always see it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 JAZZMIN_SETTINGS = {
     # title of the window (Will default to current_admin_site.site_title if absent or None)
     "site_title": "OpenAlex Admin",
@@ -132,19 +163,29 @@ JAZZMIN_SETTINGS = {
     "site_header": "OpenAlex Dashboard",
     # Title on the brand (19 chars max) (defaults to current_admin_site.site_header if absent or None)
     "site_brand": "OpenAlex Dashboard",
-    "order_with_respect_to": ["data", "sales", "auth"],
+    "order_with_respect_to": ["data", "sales", "jobs", "auth"],
 }
 
 
 class ApiKeysDbRouter:
     # routes to api keys stored within openalex-api-proxy database
+    # the proxy owns that schema, so nothing is migrated there; the zendesk user cache
+    # is our own table and lives on the default database
+    local_models = {"zendeskuser"}
+
+    def _is_proxy_model(self, model):
+        return (
+            model._meta.app_label == "sales"
+            and model._meta.model_name not in self.local_models
+        )
+
     def db_for_read(self, model, **hints):
-        if model._meta.app_label == "sales":
+        if self._is_proxy_model(model):
             return "api_keys"
         return None
 
     def db_for_write(self, model, **hints):
-        if model._meta.app_label == "sales":
+        if self._is_proxy_model(model):
             return "api_keys"
         return None
 
@@ -155,11 +196,15 @@ class ApiKeysDbRouter:
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         if app_label == "sales":
-            return False
-        return False
+            return db == "default" and model_name in self.local_models
+        return None
 
 
 class OpenAlexDbRouter:
+    # the openalex pipeline owns these tables; data migrations only change them through
+    # the helpers in data/schema.py
+    external_models = {"concept", "journal", "publisher"}
+
     def db_for_read(self, model, **hints):
         if model._meta.app_label == "data":
             return "openalex"
@@ -177,11 +222,19 @@ class OpenAlexDbRouter:
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         if app_label == "data":
-            return False
-        return False
+            return db == "openalex" and model_name not in self.external_models
+        return None
+
+
+class DefaultDbRouter:
+    # the job queue (and the zendesk user cache, see ApiKeysDbRouter) are the only
+    # tables migrated on the default database
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return app_label == "jobs" and db == "default"
 
 
 DATABASE_ROUTERS = [
     "project.settings.ApiKeysDbRouter",
     "project.settings.OpenAlexDbRouter",
+    "project.settings.DefaultDbRouter",
 ]
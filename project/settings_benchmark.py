@@ -0,0 +1,22 @@
+# settings for `manage.py run_benchmarks --settings=project.settings_benchmark`: every
+# database is a throwaway sqlite file, and outbound calls never leave the process
+import os
+import tempfile
+
+from project.settings import *  # noqa: F401,F403
+
+BENCHMARK_MODE = True
+BENCHMARK_DB_DIR = os.getenv("BENCHMARK_DB_DIR") or tempfile.mkdtemp(
+    prefix="dashboard-benchmark-"
+)
+
+DATABASES = {
+    alias: {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BENCHMARK_DB_DIR, f"{alias}.sqlite3"),
+    }
+    for alias in ("default", "api_keys", "openalex")
+}
+
+SECRET_KEY = SECRET_KEY or "benchmark"  # noqa: F405
+ALLOWED_HOSTS = ["*"]
@@ -1,6 +1,10 @@
 from django.contrib import admin
 from django.urls import path
 
+from project.views import metrics_view, outbound_status
+
 urlpatterns = [
+    path("admin/outbound-status/", outbound_status, name="outbound_status"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
 ]
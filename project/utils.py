@@ -0,0 +1,10 @@
+def chunked(iterable, size):
+    """yield lists of up to size items from iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,36 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+
+from project import metrics
+from project.http import CircuitBreaker, get_session
+
+
+@staff_member_required
+def outbound_status(request):
+    """circuit breaker state and latency per upstream host, for this process"""
+    return JsonResponse(get_session().status())
+
+
+def _has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+def metrics_view(request):
+    """prometheus text format; per process, so each worker reports its own numbers"""
+    if not (_has_metrics_token(request) or request.user.is_staff):
+        return HttpResponseForbidden()
+    lines = [
+        "# HELP dashboard_upstream_circuit_open 1 if the circuit breaker for host is open",
+        "# TYPE dashboard_upstream_circuit_open gauge",
+    ]
+    for host, status in get_session().status().items():
+        is_open = int(status["state"] == CircuitBreaker.OPEN)
+        lines.append(f'dashboard_upstream_circuit_open{{host="{host}"}} {is_open}')
+    return HttpResponse(
+        metrics.render(lines), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
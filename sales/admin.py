@@ -1,14 +1,18 @@
 import datetime
 
 from django.contrib import admin, messages
-from django.core import serializers
-from django.http import HttpResponse
+import requests
 import shortuuid
 
-from sales.heroku_api import HerokuAPI
+from jobs.models import Job
+from project.exports import export_as_csv, export_as_jsonl
+from project.permissions import in_group_or_superuser
 from sales.models import APIKey, RatelimitExempt
 from sales.zendesk_api import ZendeskAPI
 
+# seconds to wait before publishing rate-limit exempt emails, so bulk edits coalesce
+HEROKU_SYNC_WINDOW = 60
+
 
 class ApiKeyAdmin(admin.ModelAdmin):
     list_display = (
@@ -34,7 +38,7 @@ class ApiKeyAdmin(admin.ModelAdmin):
         "zendesk_organization_id",
     ]
 
-    actions = ["test_action", "zendesk_sync"]
+    actions = ["zendesk_sync", export_as_csv, export_as_jsonl]
 
     def get_form(self, request, obj=None, **kwargs):
         form = super(ApiKeyAdmin, self).get_form(request, obj, **kwargs)
@@ -65,18 +69,17 @@ class ApiKeyAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         return is_sales_or_superuser(request.user)
 
-    @admin.action(description="Test Action")
-    def test_action(self, request, queryset):
-        for obj in queryset:
-            print(obj.email)
-        response = HttpResponse(content_type="application/json")
-        serializers.serialize("json", queryset, stream=response)
-        return response
-
     @admin.action(description="Zendesk Sync")
     def zendesk_sync(self, request, queryset):
-        for obj in queryset:
-            self.zendesk_create_or_update(request, obj)
+        ids = list(queryset.values_list("id", flat=True))
+        job = Job.objects.enqueue(
+            "sales.tasks.zendesk_sync_api_keys", payload={"api_key_ids": ids}
+        )
+        messages.info(
+            request,
+            f"Queued a Zendesk sync of {len(ids)} users (job {job.id}). "
+            "Per-user results are shown on the job once it has run.",
+        )
 
     def zendesk_create_or_update(self, request, obj):
         zendesk_user = ZendeskAPI(
@@ -86,7 +89,15 @@ class ApiKeyAdmin(admin.ModelAdmin):
             organization_name=obj.organization,
             domain_name=obj.premium_domain,
         )
-        r = zendesk_user.create_or_update_user(premium=True)
+        try:
+            r = zendesk_user.create_or_update_user(premium=True)
+        except requests.RequestException as e:
+            messages.warning(
+                request,
+                f"{obj.email} was saved but not synced to Zendesk ({e}). "
+                "Use the Zendesk Sync action once Zendesk is reachable again.",
+            )
+            return
         messages.info(request, " -- ".join(r["msg"]))
 
 
@@ -120,18 +131,28 @@ class RatelimitExemptAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change: bool) -> None:
         super().save_model(request, obj, form, change)
         # Extra actions:
-        heroku_api = HerokuAPI()
-        all_objs = RatelimitExempt.objects.filter(active=True)
-        emails = ";".join([o.email for o in all_objs])
-        update_dict = {"TOP_SECRET_UNLIMITED_EMAILS": emails}
-        r = heroku_api.update_config_vars(
-            app_name="openalex-api-proxy", update_dict=update_dict
+        self.schedule_heroku_sync(request)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.schedule_heroku_sync(request)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self.schedule_heroku_sync(request)
+
+    def schedule_heroku_sync(self, request):
+        # every config var change restarts the proxy, so edits within the window
+        # share one sync job
+        Job.objects.enqueue(
+            "sales.tasks.sync_unlimited_emails",
+            key="sync_unlimited_emails",
+            delay=HEROKU_SYNC_WINDOW,
         )
-        if r.status_code != 200:
-            print(r.text)
+        count = RatelimitExempt.objects.filter(active=True).count()
         messages.info(
             request,
-            f"heroku api returned status code {r.status_code}. There are {len(all_objs)} rate-limit exempt emails.",
+            f"There are {count} rate-limit exempt emails. They will be published to the API proxy within {HEROKU_SYNC_WINDOW} seconds.",
         )
 
     def has_module_permission(self, request):
@@ -151,11 +172,7 @@ class RatelimitExemptAdmin(admin.ModelAdmin):
 
 
 def is_sales_or_superuser(user):
-    if user.is_superuser:
-        return True
-    if user.groups.filter(name="Sales").exists():
-        return True
-    return False
+    return in_group_or_superuser(user, "Sales")
 
 
 admin.site.register(APIKey, ApiKeyAdmin)
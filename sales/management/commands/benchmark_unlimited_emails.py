@@ -0,0 +1,99 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from sales import unlimited_emails
+from sales.models import RatelimitExempt
+
+# heroku's limit for all of an app's config vars together
+HEROKU_CONFIG_LIMIT = 32 * 1024
+
+
+def fake_emails(count, rng):
+    domains = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) + ".edu"
+        for _ in range(max(count // 20, 1))
+    ]
+    return [
+        "".join(rng.choices(string.ascii_lowercase + ".", k=rng.randint(5, 15)))
+        + str(i)
+        + "@"
+        + rng.choice(domains)
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and lookup time of the unlimited email formats"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            action="append",
+            help="number of fake emails, can be repeated (default 1000, 10000, 100000)",
+        )
+        parser.add_argument(
+            "--from-db",
+            action="store_true",
+            help="use the active rate-limit exempt emails instead of fake ones",
+        )
+        parser.add_argument("--lookups", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        if options["from_db"]:
+            email_sets = [
+                list(
+                    RatelimitExempt.objects.filter(active=True).values_list(
+                        "email", flat=True
+                    )
+                )
+            ]
+        else:
+            counts = options["count"] or [1000, 10000, 100000]
+            email_sets = [fake_emails(count, rng) for count in counts]
+
+        self.stdout.write(
+            f"{'emails':>8} {'format':>7} {'bytes':>10} {'parse ms':>9} "
+            f"{'lookup us':>10} {'parse+lookup us':>16}"
+        )
+        for emails in email_sets:
+            # half hits, half misses
+            hits = options["lookups"] // 2 if emails else 0
+            probes = [rng.choice(emails) for _ in range(hits)]
+            probes += [
+                f"missing{i}@example.org" for i in range(options["lookups"] - hits)
+            ]
+            for fmt in unlimited_emails.FORMATS:
+                self.report(emails, probes, fmt)
+
+    def report(self, emails, probes, fmt):
+        value = unlimited_emails.encode(emails, fmt)
+
+        start = time.perf_counter()
+        members = unlimited_emails.decode(value, fmt)
+        parse = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = sum(1 for email in probes if email in members)
+        lookup = (time.perf_counter() - start) / len(probes)
+
+        # what a proxy that re-parses the config var on every request would pay
+        sample = probes[:100]
+        start = time.perf_counter()
+        for email in sample:
+            email in unlimited_emails.decode(value, fmt)
+        per_request = (time.perf_counter() - start) / len(sample)
+
+        size = len(value.encode())
+        over = " (over heroku's config limit)" if size > HEROKU_CONFIG_LIMIT else ""
+        self.stdout.write(
+            f"{len(emails):>8} {fmt:>7} {size:>10} {parse * 1000:>9.2f} "
+            f"{lookup * 1e6:>10.2f} {per_request * 1e6:>16.1f}{over}"
+        )
+        if found < len(probes) // 2:
+            self.stderr.write(f"{fmt}: only {found} of the known emails were found")
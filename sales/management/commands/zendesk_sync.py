@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.models import APIKey
+from sales.tasks import zendesk_sync_api_keys
+
+
+class Command(BaseCommand):
+    help = "Create or update Zendesk users for API keys in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--email", action="append", help="only this key's email, can be repeated"
+        )
+        parser.add_argument(
+            "--all-active", action="store_true", help="every active, non-demo key"
+        )
+
+    def handle(self, *args, **options):
+        if options["email"]:
+            qs = APIKey.objects.filter(email__in=options["email"])
+        elif options["all_active"]:
+            qs = APIKey.objects.filter(active=True, is_demo=False)
+        else:
+            raise CommandError("pass --email or --all-active")
+
+        result = zendesk_sync_api_keys(list(qs.values_list("id", flat=True)))
+        for user in result["users"]:
+            line = f"{user['email']}: {user['status']}"
+            if user["id"]:
+                line += f" ({user['id']})"
+            if user.get("tagged"):
+                line += ", premium tag added"
+            if user["error"]:
+                line += f" -- {user['error']}"
+            self.stdout.write(line)
+        self.stdout.write(f"{result['synced']} synced, {result['failed']} failed")
@@ -0,0 +1,70 @@
+# api_key and ratelimit_exempt belong to the api proxy, so ApiKeysDbRouter never migrates
+# them; only zendesk_user_cache is created, on the default database.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(blank=True, max_length=255, null=True)),
+                ('key', models.CharField(max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('active', models.BooleanField(default=True)),
+                ('expires', models.DateField(null=True)),
+                ('is_demo', models.BooleanField(default=False)),
+                ('organization', models.CharField(blank=True, max_length=500, null=True)),
+                ('notes', models.CharField(blank=True, max_length=500, null=True)),
+                ('premium_domain', models.CharField(blank=True, max_length=255, null=True)),
+                ('zendesk_organization_id', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'API Key',
+                'verbose_name_plural': 'API Keys',
+                'db_table': 'api_key',
+            },
+        ),
+        migrations.CreateModel(
+            name='RatelimitExempt',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('email', models.CharField(max_length=255, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires', models.DateField(blank=True, null=True)),
+                ('zendesk_ticket', models.CharField(blank=True, max_length=255, null=True)),
+                ('name', models.CharField(blank=True, max_length=255, null=True)),
+                ('notes', models.CharField(blank=True, max_length=255, null=True)),
+                ('active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'High Rate-Limit Email',
+                'verbose_name_plural': 'High Rate-Limit Emails',
+                'db_table': 'ratelimit_exempt',
+            },
+        ),
+        migrations.CreateModel(
+            name='ZendeskUser',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('email', models.CharField(max_length=255, unique=True)),
+                ('user_id', models.BigIntegerField()),
+                ('organization_id', models.BigIntegerField(blank=True, null=True)),
+                ('fetched', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Zendesk User',
+                'verbose_name_plural': 'Zendesk Users',
+                'db_table': 'zendesk_user_cache',
+            },
+        ),
+    ]
@@ -1,4 +1,8 @@
+import datetime
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from functools import cached_property
 
 
@@ -29,6 +33,7 @@ class APIKey(models.Model):
 
         return ZendeskAPI(
             email=self.email,
+            name=self.name,
             organization_id=self.zendesk_organization_id,
             organization_name=self.organization,
             domain_name=self.premium_domain,
@@ -47,4 +52,56 @@ class RatelimitExempt(models.Model):
     class Meta:
         db_table = "ratelimit_exempt"
         verbose_name = "High Rate-Limit Email"
-        verbose_name_plural = "High Rate-Limit Emails"
\ No newline at end of file
+        verbose_name_plural = "High Rate-Limit Emails"
+
+
+class ZendeskUserManager(models.Manager):
+    def lookup(self, email):
+        """the cached entry for email, or None if there isn't a fresh one"""
+        cutoff = timezone.now() - datetime.timedelta(seconds=settings.ZENDESK_USER_CACHE_TTL)
+        return self.filter(email=email.lower(), fetched__gte=cutoff).first()
+
+    def remember(self, email, user_id, organization_id=None):
+        """store what zendesk told us about email; organization_id=None keeps the old one"""
+        defaults = {"user_id": user_id, "fetched": timezone.now()}
+        if organization_id is not None:
+            defaults["organization_id"] = organization_id
+        self.update_or_create(email=email.lower(), defaults=defaults)
+
+    def remember_many(self, users):
+        """remember(email, user_id) for many users in one upsert"""
+        now = timezone.now()
+        # one row per email, postgres won't upsert the same row twice in a statement
+        user_ids = {email.lower(): user_id for email, user_id in users}
+        self.bulk_create(
+            [
+                ZendeskUser(email=email, user_id=user_id, fetched=now)
+                for email, user_id in user_ids.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["email"],
+            update_fields=["user_id", "fetched"],
+        )
+
+    def forget(self, email):
+        self.filter(email=email.lower()).delete()
+
+
+class ZendeskUser(models.Model):
+    """email -> zendesk user id, so we don't search zendesk on every save and sync"""
+
+    id = models.AutoField(primary_key=True)
+    email = models.CharField(max_length=255, null=False, unique=True)
+    user_id = models.BigIntegerField(null=False)
+    organization_id = models.BigIntegerField(null=True, blank=True)
+    fetched = models.DateTimeField(null=False)
+
+    objects = ZendeskUserManager()
+
+    class Meta:
+        db_table = "zendesk_user_cache"
+        verbose_name = "Zendesk User"
+        verbose_name_plural = "Zendesk Users"
+
+    def __str__(self):
+        return f"{self.email} ({self.user_id})"
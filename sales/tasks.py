@@ -0,0 +1,54 @@
+from django.conf import settings
+
+from sales import unlimited_emails
+from sales.heroku_api import HerokuAPI
+from sales.models import APIKey, RatelimitExempt
+from sales.zendesk_api import ZendeskBulkAPI
+
+PROXY_APP_NAME = "openalex-api-proxy"
+
+
+def unlimited_emails_value(fmt="plain"):
+    emails = RatelimitExempt.objects.filter(active=True).values_list("email", flat=True)
+    return unlimited_emails.encode(emails, fmt)
+
+
+def sync_unlimited_emails():
+    """publish the active rate-limit exempt emails to the proxy's config vars.
+
+    queued (and coalesced) by RatelimitExemptAdmin; the PATCH restarts the proxy dynos,
+    so it is skipped when the config vars already have the same emails. the config var
+    of the other format is deleted, so switching to sha256 doesn't leave the plain
+    addresses behind."""
+    fmt = settings.UNLIMITED_EMAILS_FORMAT
+    config_var = unlimited_emails.CONFIG_VARS[fmt]
+    heroku_api = HerokuAPI()
+    value = unlimited_emails_value(fmt)
+    config_vars = heroku_api.get_config_vars(PROXY_APP_NAME)
+    current = config_vars.get(config_var) or ""
+    try:
+        unchanged = unlimited_emails.decode(current, fmt) == unlimited_emails.decode(
+            value, fmt
+        )
+    except ValueError:
+        # whatever is there isn't in this format, overwrite it
+        unchanged = False
+    update_dict = {} if unchanged else {config_var: value}
+    for other_var in unlimited_emails.CONFIG_VARS.values():
+        if other_var != config_var and other_var in config_vars:
+            # heroku deletes config vars set to null
+            update_dict[other_var] = None
+    if not update_dict:
+        return
+    r = heroku_api.update_config_vars(app_name=PROXY_APP_NAME, update_dict=update_dict)
+    r.raise_for_status()
+
+
+def zendesk_sync_api_keys(api_key_ids):
+    """create or update the zendesk users for these api keys, queued by the
+    "Zendesk Sync" admin action. the per-user results end up in Job.result."""
+    keys = APIKey.objects.filter(id__in=api_key_ids).order_by("id")
+    users = [key.zendesk_api.user_payload(premium=True) for key in keys]
+    results = ZendeskBulkAPI().sync_users(users, premium=True)
+    failed = sum(1 for r in results if r["status"] == "failed")
+    return {"synced": len(results) - failed, "failed": failed, "users": results}
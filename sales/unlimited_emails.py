@@ -0,0 +1,78 @@
+import base64
+import hashlib
+
+# the proxy reads one of these config vars, depending on UNLIMITED_EMAILS_FORMAT; only
+# the one for the current format is kept
+CONFIG_VARS = {
+    "plain": "TOP_SECRET_UNLIMITED_EMAILS",
+    "sha256": "TOP_SECRET_UNLIMITED_EMAIL_HASHES",
+}
+FORMATS = tuple(CONFIG_VARS)
+HASH_PREFIX = "sha256-64:"
+# 8 bytes per email: a collision is vanishingly unlikely at millions of emails, and
+# the base64 payload is ~11 characters per email instead of ~25 for the address
+DIGEST_SIZE = 8
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def email_digest(email):
+    return hashlib.sha256(normalize_email(email).encode()).digest()[:DIGEST_SIZE]
+
+
+class HashedEmails:
+    """membership checks against a sorted run of fixed-size email digests.
+
+    this is the reference for what the proxy should do: decode the config var once,
+    then binary search it per request. lookups are case-insensitive."""
+
+    def __init__(self, data):
+        if len(data) % DIGEST_SIZE:
+            raise ValueError("hashed email data is not a whole number of digests")
+        self.data = data
+
+    @classmethod
+    def from_config(cls, value):
+        if not value.startswith(HASH_PREFIX):
+            raise ValueError(f"hashed emails should start with {HASH_PREFIX!r}")
+        return cls(base64.b64decode(value[len(HASH_PREFIX) :]))
+
+    def __len__(self):
+        return len(self.data) // DIGEST_SIZE
+
+    def __contains__(self, email):
+        digest = email_digest(email)
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mid * DIGEST_SIZE
+            if self.data[start : start + DIGEST_SIZE] < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo * DIGEST_SIZE
+        return self.data[start : start + DIGEST_SIZE] == digest
+
+    def __eq__(self, other):
+        return isinstance(other, HashedEmails) and self.data == other.data
+
+
+def encode(emails, fmt="plain"):
+    """config var value for emails in the given format"""
+    if fmt == "plain":
+        return ";".join(sorted(emails))
+    if fmt == "sha256":
+        digests = sorted({email_digest(email) for email in emails})
+        return HASH_PREFIX + base64.b64encode(b"".join(digests)).decode()
+    raise ValueError(f"unknown unlimited emails format {fmt!r}, expected one of {FORMATS}")
+
+
+def decode(value, fmt="plain"):
+    """something that supports `email in result`, from a config var value"""
+    if fmt == "plain":
+        return frozenset(filter(None, (value or "").split(";")))
+    if fmt == "sha256":
+        return HashedEmails.from_config(value) if value else HashedEmails(b"")
+    raise ValueError(f"unknown unlimited emails format {fmt!r}, expected one of {FORMATS}")
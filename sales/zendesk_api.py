@@ -1,6 +1,14 @@
 import os
+import time
 from functools import cached_property
-import requests
+
+from project.http import get_session
+from sales.models import ZendeskUser
+from project.utils import chunked
+
+# the most users Zendesk accepts in one bulk request
+BULK_BATCH_SIZE = 100
+JOB_DONE_STATUSES = ("completed", "failed", "killed")
 
 
 class ZendeskAPI:
@@ -18,6 +26,7 @@ class ZendeskAPI:
         self.user = os.getenv("ZENDESK_USER_ACCOUNT")
         self.token = os.getenv("ZENDESK_API_TOKEN")
         self.auth = (f"{self.user}/token", self.token)
+        self.session = get_session()
 
         self.email = email
         self.name = name
@@ -27,6 +36,9 @@ class ZendeskAPI:
 
     @cached_property
     def zendesk_user_id(self):
+        cached = ZendeskUser.objects.lookup(self.email)
+        if cached:
+            return cached.user_id
         return self.get_zendesk_user_id_from_email()
 
     def query_search_by_email(self, email):
@@ -34,8 +46,7 @@ class ZendeskAPI:
         params = {
             'query': f'email:{email}'
         }
-        print("making query")
-        r = requests.get(url, params=params, auth=self.auth)
+        r = self.session.get(url, params=params, auth=self.auth)
         r.raise_for_status()
         num_results = r.json()['count']
         if num_results == 1:
@@ -48,29 +59,41 @@ class ZendeskAPI:
     def get_zendesk_user_id_from_email(self):
         user = self.query_search_by_email(self.email)
         if user:
+            ZendeskUser.objects.remember(
+                self.email, user['id'], user.get('organization_id')
+            )
             return user['id']
         else:
             return None
 
-    def create_user(self, premium=True):
-        ret = {"msg": []}
+    def user_payload(self, premium=True, new=False):
+        """the user as zendesk wants it. without a name of ours the name is left out,
+        so an existing user's name isn't replaced; a new user needs one, so new=True
+        falls back to the email"""
+        user = {"email": self.email}
         if self.name:
-            name = self.name
-        else:
-            name = self.email
-        user = {"email": self.email, "name": name}
+            user["name"] = self.name
+        elif new:
+            user["name"] = self.email
         if not self.organization_id and self.organization_name is not None:
             user["organization"] = {"name": self.organization_name}
         if premium is True:
             user["tags"] = ["premium"]
+        return user
+
+    def create_user(self, premium=True):
+        ret = {"msg": []}
+        user = self.user_payload(premium=premium, new=True)
         url = f'{self.base_url}/users.json'
         body = {"user": user}
         params = {"skip_verify_email": True}
-        r = requests.post(url, params=params, json=body, auth=self.auth)
+        r = self.session.post(url, params=params, json=body, auth=self.auth)
         if r.status_code > 299:
             ret["msg"].append("Error adding new user in Zendesk.")
         else:
-            ret["msg"].append(f"Added new user in Zendesk: {self.email} ({r.json()['user']['id']})")
+            user = r.json()['user']
+            self.remember_user(user)
+            ret["msg"].append(f"Added new user in Zendesk: {self.email} ({user['id']})")
         return ret
 
     def update_user(self, premium=True):
@@ -79,7 +102,10 @@ class ZendeskAPI:
             user = {"name": self.name}
             url = f'{self.base_url}/users/{self.zendesk_user_id}.json'
             body = {"user": user}
-            r = requests.put(url, json=body, auth=self.auth)
+            r = self.session.put(url, json=body, auth=self.auth)
+            if r.status_code == 404:
+                self.forget_user()
+                return {"msg": [], "stale": True}
             if r.status_code > 299:
                 ret["msg"].append(f"Error encountered updating user in Zendesk.")
             else:
@@ -87,16 +113,170 @@ class ZendeskAPI:
         if premium is True:
             url = f'{self.base_url}/users/{self.zendesk_user_id}/tags.json'
             body = {"tags": ["premium"]}
-            r = requests.put(url, json=body, auth=self.auth)
+            r = self.session.put(url, json=body, auth=self.auth)
+            if r.status_code == 404 and not self.name:
+                self.forget_user()
+                return {"msg": [], "stale": True}
             if r.status_code > 299:
                 ret["msg"].append("Error encountered adding premium tag in Zendesk.")
             else:
                 ret["msg"].append(f"Added premium tag to Zendesk user: {self.email} ({self.zendesk_user_id})")
         return ret
 
+    def remember_user(self, user):
+        ZendeskUser.objects.remember(self.email, user['id'], user.get('organization_id'))
+        self.zendesk_user_id = user['id']
+
+    def forget_user(self):
+        """drop a user id that zendesk no longer knows (deleted or merged)"""
+        ZendeskUser.objects.forget(self.email)
+        self.__dict__.pop('zendesk_user_id', None)
+
     def create_or_update_user(self, premium=True):
         """create or update user in zendesk with all available info"""
+        if self.zendesk_user_id:
+            ret = self.update_user(premium=premium)
+            if not ret.get("stale"):
+                return ret
+            # the cached id was stale, look the email up again
         if self.zendesk_user_id:
             return self.update_user(premium=premium)
         else:
             return self.create_user(premium=premium)
+
+
+class ZendeskBulkAPI:
+    """create or update many users at once through Zendesk's bulk endpoints.
+
+    bulk requests return a job status that has to be polled until Zendesk has
+    processed the batch; the per-user results come from the finished job."""
+
+    def __init__(self, poll_interval=2, poll_timeout=300) -> None:
+        self.base_url = os.getenv("ZENDESK_API_BASE_URL")
+        self.user = os.getenv("ZENDESK_USER_ACCOUNT")
+        self.token = os.getenv("ZENDESK_API_TOKEN")
+        self.auth = (f"{self.user}/token", self.token)
+        self.session = get_session()
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+
+    def create_or_update_many(self, users):
+        url = f"{self.base_url}/users/create_or_update_many.json"
+        r = self.session.post(url, json={"users": users}, auth=self.auth)
+        r.raise_for_status()
+        return r.json()["job_status"]
+
+    def update_many(self, users):
+        """users are dicts with an id and the fields to change for that user"""
+        url = f"{self.base_url}/users/update_many.json"
+        r = self.session.put(url, json={"users": users}, auth=self.auth)
+        r.raise_for_status()
+        return r.json()["job_status"]
+
+    def show_many(self, user_ids):
+        url = f"{self.base_url}/users/show_many.json"
+        ids = ",".join(str(i) for i in user_ids)
+        r = self.session.get(url, params={"ids": ids}, auth=self.auth)
+        r.raise_for_status()
+        return r.json()["users"]
+
+    def wait_for_job(self, job_status):
+        """poll a job status until it finishes and return its results"""
+        deadline = time.monotonic() + self.poll_timeout
+        while job_status["status"] not in JOB_DONE_STATUSES:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"zendesk job {job_status['id']} did not finish")
+            time.sleep(self.poll_interval)
+            url = f"{self.base_url}/job_statuses/{job_status['id']}.json"
+            r = self.session.get(url, auth=self.auth)
+            r.raise_for_status()
+            job_status = r.json()["job_status"]
+        if job_status["status"] != "completed" and not job_status.get("results"):
+            raise RuntimeError(
+                f"zendesk job {job_status['id']} {job_status['status']}: "
+                f"{job_status.get('message')}"
+            )
+        return job_status.get("results") or []
+
+    def sync_users(self, users, premium=True):
+        """create or update users (payloads from ZendeskAPI.user_payload) in batches of 100.
+
+        returns one {"email", "id", "status", "error"} dict per user, in order."""
+        results = []
+        for batch in chunked(users, BULK_BATCH_SIZE):
+            # tags sent with create_or_update replace a user's existing tags, so the
+            # premium tag is added separately once we know who is missing it
+            payload = [{k: v for k, v in u.items() if k != "tags"} for u in batch]
+            job_results = self.wait_for_job(self.create_or_update_many(payload))
+            batch_results = self.match_results(batch, job_results)
+            self.retry_without_name(payload, batch_results)
+            self.remember_users(batch_results)
+            if premium:
+                self.add_premium_tag(batch_results)
+            results.extend(batch_results)
+        return results
+
+    def match_results(self, batch, job_results):
+        """line job results up with the users that were sent"""
+        results = [
+            {"email": u["email"], "id": None, "status": "unknown", "error": None}
+            for u in batch
+        ]
+        by_email = {u["email"].lower(): i for i, u in enumerate(batch)}
+        for position, job_result in enumerate(job_results):
+            if "index" in job_result:
+                i = job_result["index"]
+            elif job_result.get("email"):
+                i = by_email.get(job_result["email"].lower())
+            else:
+                i = position
+            if i is None or i >= len(results):
+                continue
+            results[i]["id"] = job_result.get("id")
+            if job_result.get("error"):
+                results[i]["status"] = "failed"
+                results[i]["error"] = job_result.get("details") or job_result["error"]
+            else:
+                results[i]["status"] = (job_result.get("status") or "done").lower()
+        return results
+
+    def retry_without_name(self, payload, results):
+        """users are sent without a name when we don't have one, so existing users keep
+        theirs. a new user can't be created without one though; those are sent again
+        named after their email."""
+        retry = [
+            i
+            for i, (user, result) in enumerate(zip(payload, results))
+            if "name" not in user
+            and result["status"] == "failed"
+            and "name" in str(result["error"]).lower()
+        ]
+        if not retry:
+            return
+        users = [{**payload[i], "name": payload[i]["email"]} for i in retry]
+        job_results = self.wait_for_job(self.create_or_update_many(users))
+        for i, result in zip(retry, self.match_results(users, job_results)):
+            results[i] = result
+
+    def remember_users(self, results):
+        ZendeskUser.objects.remember_many(
+            (result["email"], result["id"])
+            for result in results
+            if result["id"] and result["status"] != "failed"
+        )
+
+    def add_premium_tag(self, results):
+        ids = [r["id"] for r in results if r["id"] and r["status"] != "failed"]
+        if not ids:
+            return
+        missing = [
+            {"id": user["id"], "tags": user["tags"] + ["premium"]}
+            for user in self.show_many(ids)
+            if "premium" not in user["tags"]
+        ]
+        if not missing:
+            return
+        tagged = {r.get("id") for r in self.wait_for_job(self.update_many(missing))}
+        for result in results:
+            if result["id"] in tagged:
+                result["tagged"] = True